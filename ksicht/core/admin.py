@@ -166,8 +166,13 @@ class SolutionSubmissionAdmin(admin.ModelAdmin):
         "series",
         "score",
         "submitted_at",
+        "page_count",
+        "is_valid_pdf",
+        "export_status",
     )
     list_filter = (
+        "export_status",
+        "is_valid_pdf",
         "task__series__grade",
         "task__series__series",
         "task__nr",
@@ -177,7 +182,13 @@ class SolutionSubmissionAdmin(admin.ModelAdmin):
         "task__series",
     )
     autocomplete_fields = ("task", "application")
-    readonly_fields = ("submitted_at",)
+    readonly_fields = (
+        "submitted_at",
+        "page_count",
+        "file_size",
+        "file_hash",
+        "is_valid_pdf",
+    )
     ordering = ("application__participant__user__last_name",)
     search_fields = (
         "application__participant__user__last_name",
@@ -206,6 +217,74 @@ class StickerAdmin(admin.ModelAdmin):
     list_display = ("nr", "title", "handpicked")
 
 
+@admin.register(models.StickerAward)
+class StickerAwardAdmin(admin.ModelAdmin):
+    list_display = ("sticker", "user", "series", "source", "resolver", "created_at")
+    list_filter = ("series__grade", "series__series", "source", "sticker")
+    list_select_related = ("application__participant__user", "series", "sticker")
+    search_fields = (
+        "application__participant__user__last_name",
+        "application__participant__user__first_name",
+    )
+
+    def user(self, obj: models.StickerAward):
+        return obj.application.participant.user
+
+    user.short_description = "Uživatel"
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(models.Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = (
+        "name",
+        "status",
+        "attempts",
+        "created_at",
+        "run_after",
+        "finished_at",
+    )
+    list_filter = ("status", "name")
+    readonly_fields = (
+        "name",
+        "payload",
+        "attempts",
+        "error",
+        "created_at",
+        "run_after",
+        "started_at",
+        "finished_at",
+    )
+    actions = ("retry",)
+
+    def has_add_permission(self, request):
+        return False
+
+    def retry(self, request, queryset):
+        # Jobs done or still running must not run twice.
+        retried = (
+            queryset.filter(status=models.Job.STATUS_FAILED) | queryset.stale()
+        ).update(status=models.Job.STATUS_PENDING, run_after=None)
+        self.message_user(request, f"Znovu zařazeno do fronty: {retried}")
+
+    retry.short_description = "Zařadit znovu do fronty (selhané a zaseknuté)"
+
+
+@admin.register(models.ExportArtifact)
+class ExportArtifactAdmin(admin.ModelAdmin):
+    list_display = ("key", "updated_at")
+    readonly_fields = ("key", "fingerprint", "file", "updated_at")
+    search_fields = ("key",)
+
+    def has_add_permission(self, request):
+        return False
+
+
 class EventAttendeeInline(admin.TabularInline):
     model = models.EventAttendee
     readonly_fields = ("signup_date",)
@@ -0,0 +1,89 @@
+"""Versioned cache keys.
+
+Cached data get stored under keys carrying the current version of every namespace they
+depend on. Once a model of the namespace changes, its version gets bumped, so all the
+keys built from the old version are never used again and expire on their own.
+"""
+
+from functools import partial
+import time
+from typing import Dict, Iterable, Optional
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+
+
+GRADE = "grade"
+FLATPAGE = "flatpage"
+
+NAMESPACES = (GRADE, FLATPAGE)
+
+VERSION_CACHE_KEY = "cache_version::{}"
+
+
+def _initial_version() -> int:
+    # Version of an evicted namespace must not repeat any of the previous ones.
+    return time.time_ns() // 1000
+
+
+def get_versions(namespaces: Iterable[str]) -> Dict[str, int]:
+    """Current versions of the namespaces, fetched with a single cache round trip."""
+    keys = {VERSION_CACHE_KEY.format(ns): ns for ns in namespaces}
+
+    if unknown := set(keys.values()) - set(NAMESPACES):
+        raise ValueError(f"Unknown cache namespaces: {', '.join(sorted(unknown))}")
+
+    versions = cache.get_many(keys)
+
+    for key in keys.keys() - versions.keys():
+        cache.add(key, _initial_version(), None)
+        versions[key] = cache.get(key)
+
+    return {keys[key]: version for key, version in versions.items()}
+
+
+def make_key(key: str, *namespaces: str) -> str:
+    """Build cache key which changes whenever any of the namespaces get bumped."""
+    versions = get_versions(namespaces)
+    return "::".join([key, *(f"{ns}.{versions[ns]}" for ns in namespaces)])
+
+
+def _bump(namespaces: Iterable[str]):
+    for ns in namespaces:
+        key = VERSION_CACHE_KEY.format(ns)
+
+        try:
+            cache.incr(key)
+        except ValueError:
+            # Nothing has been cached with this namespace yet, any version is new.
+            cache.add(key, _initial_version(), None)
+
+
+def bump(*namespaces: str, using: Optional[str] = None):
+    """Make all the data cached under the namespaces stale.
+
+    Versions get bumped once the current transaction commits. Bumping any sooner would
+    let concurrent requests cache the data from before the change under the new version.
+    """
+    if transaction.get_connection(using).in_atomic_block:
+        transaction.on_commit(partial(_bump, namespaces), using=using)
+    else:
+        _bump(namespaces)
+
+
+def bump_on_change(namespace: str, *senders):
+    """Bump the namespace whenever any of the models (or m2m through models) change."""
+
+    def _handler(sender, action=None, using=None, **kwargs):
+        if action is None or action.startswith("post_"):
+            bump(namespace, using=using)
+
+    for sender in senders:
+        for signal in (post_save, post_delete, m2m_changed):
+            signal.connect(
+                _handler,
+                sender=sender,
+                weak=False,
+                dispatch_uid=f"caching::{namespace}::{sender._meta.label}",
+            )
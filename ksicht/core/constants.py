@@ -1,16 +1,21 @@
 import csv
+import hashlib
 import os
 
 from django.conf import settings
 
 
+SCHOOLS_FILEPATH = os.path.join(settings.BASE_DIR, "fixtures", "schools.csv")
+
 SCHOOLS = ()
 
 SCHOOLS_CHOICES = (("--jiná--", "-- jiná --"),)
 
-with open(
-    os.path.join(settings.BASE_DIR, "fixtures", "schools.csv"), encoding="utf8"
-) as schools_file:
+with open(SCHOOLS_FILEPATH, "rb") as schools_file:
+    # Identifies the schools dataset, e.g. for caching what's generated from it.
+    SCHOOLS_HASH = hashlib.sha256(schools_file.read()).hexdigest()
+
+with open(SCHOOLS_FILEPATH, encoding="utf8") as schools_file:
     csv_reader = csv.reader(schools_file, delimiter=";")
 
     for idx, row in enumerate(csv_reader):
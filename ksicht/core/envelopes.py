@@ -0,0 +1,74 @@
+import hashlib
+import tempfile
+from typing import List
+
+from django.conf import settings
+
+from ksicht import pdf
+from . import models
+from .constants import SCHOOLS, SCHOOLS_HASH
+
+
+SCHOOL_ENVELOPES_KEY = "school_envelopes"
+
+
+def school_recipients() -> List[pdf.EnvelopeRecipientInfo]:
+    def _build_lines(s):
+        # If street exists
+        if s[9]:
+            return {
+                "lines": (
+                    "K rukám učitelů chemie",
+                    s[6],
+                    s[8],
+                    f"{s[13]} {s[14]}",
+                ),
+                "note": None,
+            }
+        return {
+            "lines": ("K rukám učitelů chemie", s[6], s[14], s[13]),
+            "note": None,
+        }
+
+    return [_build_lines(s) for s in SCHOOLS]
+
+
+def school_envelopes_fingerprint() -> str:
+    """Identify school envelopes by the schools dataset and our address."""
+    digest = hashlib.sha256(SCHOOLS_HASH.encode("utf8"))
+
+    for line in settings.KSICHT_CONTACT_ADDRESS_LINES:
+        digest.update(f"\n{line}".encode("utf8"))
+
+    return digest.hexdigest()
+
+
+def build_school_envelopes(out_file, workers: int = 1):
+    return pdf.envelopes(
+        school_recipients(),
+        settings.KSICHT_CONTACT_ADDRESS_LINES,
+        out_file,
+        workers=workers,
+    )
+
+
+def store_school_envelopes():
+    """Build and store school envelopes unless they are up to date already."""
+    fingerprint = school_envelopes_fingerprint()
+
+    if artifact := models.ExportArtifact.objects.get_fresh(
+        SCHOOL_ENVELOPES_KEY, fingerprint
+    ):
+        return artifact
+
+    with tempfile.TemporaryFile() as out_file:
+        build_school_envelopes(out_file, workers=settings.ENVELOPE_RENDER_WORKERS)
+        out_file.seek(0)
+        return models.ExportArtifact.objects.store(
+            SCHOOL_ENVELOPES_KEY, fingerprint, out_file, f"{SCHOOL_ENVELOPES_KEY}.pdf"
+        )
+
+
+def schedule_school_envelopes():
+    """Let a background job build school envelopes, unless it's been scheduled already."""
+    models.Job.objects.schedule(models.BUILD_SCHOOL_ENVELOPES_JOB, run_after=None)
@@ -0,0 +1,104 @@
+"""Background jobs processed by the `run_jobs` management command.
+
+Jobs are stored in the database (`models.Job`), handlers are registered by name using
+the `handler` decorator and receive the job payload as keyword arguments.
+"""
+
+import logging
+import traceback
+from typing import Optional
+
+from django.utils import timezone
+
+from . import envelopes, models
+
+
+logger = logging.getLogger(__name__)
+
+HANDLERS = {}
+
+
+def handler(name):
+    def decorator(handler_fn):
+        HANDLERS[name] = handler_fn
+        return handler_fn
+
+    return decorator
+
+
+def run(job: models.Job):
+    """Run claimed job and store its outcome."""
+    logger.info("Running job %s", job)
+
+    try:
+        HANDLERS[job.name](**job.payload)
+    except Exception:
+        logger.exception("Job %s failed", job)
+        job.status = models.Job.STATUS_FAILED
+        job.error = traceback.format_exc()
+    else:
+        job.status = models.Job.STATUS_DONE
+        job.error = ""
+
+    job.finished_at = timezone.now()
+    job.save(update_fields=("status", "error", "finished_at"))
+
+
+def run_pending(limit: Optional[int] = None):
+    """Run pending jobs one by one until there are none left (or `limit` is reached).
+
+    :return: Number of jobs run.
+    """
+    count = 0
+
+    while limit is None or count < limit:
+        job = models.Job.objects.claim_next()
+
+        if job is None:
+            break
+
+        run(job)
+        count += 1
+
+    return count
+
+
+@handler(models.PREPARE_SUBMISSION_EXPORT_JOB)
+def prepare_submission_export(submission_id):
+    submission = (
+        models.TaskSolutionSubmission.objects.select_related(
+            "task", "application__participant__user"
+        )
+        .filter(pk=submission_id)
+        .first()
+    )
+
+    # Submission might have been deleted in the meantime.
+    if submission is not None:
+        submission.ensure_export_ready()
+
+
+@handler(models.BUILD_EXPORT_BUNDLES_JOB)
+def build_export_bundles(series_id):
+    series = models.GradeSeries.objects.filter(pk=series_id).first()
+
+    # Series might have been deleted or its deadline moved in the meantime.
+    if series is None or series.submission_deadline > timezone.now():
+        return
+
+    for task in series.tasks.all():
+        task.store_export_bundles()
+
+
+@handler(models.BUILD_SCHOOL_ENVELOPES_JOB)
+def build_school_envelopes():
+    envelopes.store_school_envelopes()
+
+
+@handler(models.REBUILD_SERIES_RANKINGS_JOB)
+def rebuild_series_rankings(series_id):
+    series = models.GradeSeries.objects.filter(pk=series_id).first()
+
+    # Series might have been deleted in the meantime.
+    if series is not None:
+        models.SeriesRanking.objects.rebuild_from(series)
@@ -0,0 +1,58 @@
+from django.core.management.base import BaseCommand
+
+from ksicht import pdf
+from ksicht.core import models
+
+
+def count_pages(in_file):
+    """Get number of pages of the stored PDF file, `None` if it can't be read."""
+    try:
+        return len(pdf.open_pdf(in_file).pages)
+    except pdf.PdfReadError:
+        return None
+
+
+class Command(BaseCommand):
+    help = (
+        "Store page count, size, hash and validity of uploaded solutions missing them."
+    )
+
+    def handle(self, *args, **options):
+        submissions = (
+            models.TaskSolutionSubmission.objects.exclude(file="")
+            .exclude(file__isnull=True)
+            .filter(file_hash="")
+            .order_by("pk")
+        )
+        count = 0
+
+        for s in submissions.iterator():
+            try:
+                original_pages = count_pages(s.file)
+
+                if s.file_for_export_normal:
+                    page_count = count_pages(s.file_for_export_normal)
+                else:
+                    # Invalid uploads are exported as a single page with error message.
+                    page_count = original_pages or 1
+
+                with s.file.open("rb"):
+                    s.set_file_info(
+                        pdf.PreparedSubmission(
+                            page_count=page_count, is_valid=original_pages is not None
+                        )
+                    )
+            except FileNotFoundError:
+                self.stderr.write(f"File of submission {s.pk} is missing")
+                continue
+            except Exception as e:
+                # Legacy uploads can be broken in any way, don't let them stop the rest.
+                self.stderr.write(f"File of submission {s.pk} can't be read: {e!r}")
+                continue
+
+            s.save(
+                update_fields=("page_count", "file_size", "file_hash", "is_valid_pdf")
+            )
+            count += 1
+
+        self.stdout.write(f"Updated {count} submissions")
@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+
+from ksicht.core import models
+from ksicht.core.stickers.engine import evaluate_series
+
+
+class Command(BaseCommand):
+    help = "Evaluate stickers of grade series and store them in the sticker ledger."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "series",
+            nargs="*",
+            help="Series IDs, outdated series of the current grade by default.",
+        )
+        parser.add_argument(
+            "--all",
+            action="store_true",
+            help="Evaluate every series of the current grade, even if up to date.",
+        )
+
+    def handle(self, *args, series, all, **options):
+        queryset = models.GradeSeries.objects.select_related("grade")
+
+        if series:
+            queryset = queryset.filter(pk__in=series)
+        else:
+            queryset = queryset.filter(grade=models.Grade.objects.get_current())
+
+            if not all:
+                queryset = queryset.filter(stickers_evaluated_at__isnull=True)
+
+        for s in queryset.order_by("grade__start_date", "series"):
+            changed = evaluate_series(s)
+            self.stdout.write(
+                f"{s} ({s.grade}): stickers of {len(changed)} applications changed"
+            )
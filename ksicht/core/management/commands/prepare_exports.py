@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand
+
+from ksicht.core import models
+
+
+class Command(BaseCommand):
+    help = "Prepare export-ready variants of uploaded solutions again."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--grade", help="Grade ID, current grade by default.")
+        parser.add_argument(
+            "--task", help="Task ID, all tasks of the grade by default."
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=100,
+            help="Number of submissions prepared at once.",
+        )
+
+    def handle(self, *args, grade, task, chunk_size, **options):
+        submissions = (
+            models.TaskSolutionSubmission.objects.exclude(file="")
+            .exclude(file__isnull=True)
+            .select_related("task", "application__participant__user")
+            .order_by("pk")
+        )
+
+        if task:
+            submissions = submissions.filter(task_id=task)
+        else:
+            submissions = submissions.filter(
+                task__series__grade=grade or models.Grade.objects.get_current()
+            )
+
+        submissions = list(submissions)
+
+        for start in range(0, len(submissions), chunk_size):
+            models.TaskSolutionSubmission.prepare_all_for_export(
+                submissions[start : start + chunk_size]
+            )
+
+        self.stdout.write(f"Prepared {len(submissions)} submissions")
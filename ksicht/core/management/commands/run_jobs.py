@@ -0,0 +1,41 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from ksicht.core import envelopes, jobs, models
+
+
+class Command(BaseCommand):
+    help = "Process background jobs from the database queue."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Exit once there are no pending jobs instead of waiting for new ones.",
+        )
+        parser.add_argument(
+            "--sleep",
+            type=float,
+            default=2.0,
+            help="Seconds to wait before checking for new jobs again.",
+        )
+
+    def handle(self, *args, once, sleep, **options):
+        # Schools or our address might have changed with the new release.
+        envelopes.schedule_school_envelopes()
+
+        while True:
+            # Worker runs for a long time, don't rely on a connection that may be gone.
+            close_old_connections()
+            models.Job.objects.reclaim_stale()
+            count = jobs.run_pending()
+
+            if count:
+                self.stdout.write(f"Processed {count} jobs")
+
+            if once:
+                break
+
+            time.sleep(sleep)
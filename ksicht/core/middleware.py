@@ -0,0 +1,70 @@
+from functools import cached_property
+from typing import Optional
+
+from django.db.models import OuterRef, Subquery
+
+from .models import GradeApplication, Participant, User
+from .views.helpers import get_current_grade
+
+
+class Participation:
+    """Participation of the request user in the current grade.
+
+    Everything is resolved lazily with a single query on first access. The participant
+    profile gets cached on the user as well, so that `user.participant_profile` and
+    `user.is_participant()` don't hit the database again.
+    """
+
+    def __init__(self, request):
+        self.request = request
+
+    @cached_property
+    def participant(self) -> Optional[Participant]:
+        user = self.request.user
+
+        if not user.is_authenticated:
+            return None
+
+        grade, _ = get_current_grade(self.request)
+        participant = (
+            Participant.objects.filter(user=user)
+            .annotate(
+                current_application_id=Subquery(
+                    GradeApplication.objects.filter(
+                        participant=OuterRef("pk"), grade=grade
+                    ).values("pk")[:1]
+                ),
+            )
+            .first()
+        )
+
+        User.participant_profile.related.set_cached_value(user, participant)
+
+        if participant is not None:
+            participant.user = user
+
+        return participant
+
+    @property
+    def is_participant(self) -> bool:
+        return self.participant is not None
+
+    @property
+    def application_id(self) -> Optional[int]:
+        """Application of the participant to the current grade."""
+        return self.participant.current_application_id if self.participant else None
+
+    @property
+    def is_grade_participant(self) -> bool:
+        return self.application_id is not None
+
+
+class ParticipationMiddleware:
+    """Attach `Participation` of the current user to the request as `request.participation`."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.participation = Participation(request)
+        return self.get_response(request)
@@ -20,25 +20,22 @@ def prepare_export_ready_files_forwards(apps, schema_editor):
                 user_full_name or submission.application.participant.user.email
             )
 
-            file_normal, file_duplex = prepare_submission_for_export(
-                in_file=submission.file,
-                label=f"Řešitel: {participant_full_name}       Úloha č. {submission.task.nr}".encode(
-                    "utf8"
-                ),
-            )
-
-            with tempfile.TemporaryFile() as tf:
-                file_normal.write(tf)
+            with tempfile.TemporaryFile() as file_normal, tempfile.TemporaryFile() as file_duplex:
+                prepare_submission_for_export(
+                    in_file=submission.file,
+                    label=f"Řešitel: {participant_full_name}       Úloha č. {submission.task.nr}".encode(
+                        "utf8"
+                    ),
+                    out_normal=file_normal,
+                    out_duplex=file_duplex,
+                )
                 submission.file_for_export_normal.save(
                     f"submission_{submission.application.pk}_{submission.task.nr}_normal.pdf",
-                    File(tf),
+                    File(file_normal),
                 )
-
-            with tempfile.TemporaryFile() as tf:
-                file_duplex.write(tf)
                 submission.file_for_export_duplex.save(
                     f"submission_{submission.application.pk}_{submission.task.nr}_duplex.pdf",
-                    File(tf),
+                    File(file_duplex),
                 )
 
             submission.save()
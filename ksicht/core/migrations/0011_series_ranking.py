@@ -0,0 +1,72 @@
+# Generated by Django 5.0.7 on 2026-10-18 19:42
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "00010_alter_teammember"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="gradeseries",
+            name="rankings_built_at",
+            field=models.DateTimeField(
+                blank=True,
+                editable=False,
+                null=True,
+                verbose_name="Výsledková listina sestavena",
+            ),
+        ),
+        migrations.CreateModel(
+            name="SeriesRanking",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("rank", models.PositiveIntegerField(verbose_name="Pořadí")),
+                (
+                    "task_scores",
+                    models.JSONField(default=dict, verbose_name="Skóre za úlohy"),
+                ),
+                (
+                    "total_score",
+                    models.DecimalField(
+                        decimal_places=2, max_digits=7, verbose_name="Celkové skóre"
+                    ),
+                ),
+                (
+                    "application",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="series_rankings",
+                        to="core.gradeapplication",
+                        verbose_name="Přihláška",
+                    ),
+                ),
+                (
+                    "series",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="ranking_rows",
+                        to="core.gradeseries",
+                        verbose_name="Série",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Umístění v sérii",
+                "verbose_name_plural": "Umístění v sériích",
+                "ordering": ("series", "rank"),
+                "unique_together": {("series", "application")},
+            },
+        ),
+    ]
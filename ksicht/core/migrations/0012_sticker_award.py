@@ -0,0 +1,107 @@
+# Generated by Django 5.0.7 on 2026-10-18 20:09
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0011_series_ranking"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="gradeseries",
+            name="stickers_evaluated_at",
+            field=models.DateTimeField(
+                blank=True,
+                editable=False,
+                null=True,
+                verbose_name="Nálepky vyhodnoceny",
+            ),
+        ),
+        migrations.CreateModel(
+            name="StickerAward",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "source",
+                    models.CharField(
+                        choices=[
+                            ("resolver", "Automaticky"),
+                            ("event", "Za účast na akci"),
+                            ("handpicked", "Ručně"),
+                        ],
+                        max_length=20,
+                        verbose_name="Způsob udělení",
+                    ),
+                ),
+                (
+                    "resolver",
+                    models.CharField(
+                        blank=True,
+                        help_text="Název pravidla, které nálepku udělilo automaticky.",
+                        max_length=255,
+                        verbose_name="Pravidlo",
+                    ),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(
+                        auto_now_add=True, verbose_name="Datum udělení"
+                    ),
+                ),
+                (
+                    "application",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="sticker_awards",
+                        to="core.gradeapplication",
+                        verbose_name="Přihláška",
+                    ),
+                ),
+                (
+                    "event",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="sticker_awards",
+                        to="core.event",
+                        verbose_name="Akce",
+                    ),
+                ),
+                (
+                    "series",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="sticker_awards",
+                        to="core.gradeseries",
+                        verbose_name="Série",
+                    ),
+                ),
+                (
+                    "sticker",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="awards",
+                        to="core.sticker",
+                        verbose_name="Nálepka",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Udělená nálepka",
+                "verbose_name_plural": "Udělené nálepky",
+                "ordering": ("series", "application", "sticker"),
+            },
+        ),
+    ]
@@ -0,0 +1,91 @@
+# Generated by Django 5.0.7 on 2026-10-18 20:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0012_sticker_award"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Job",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "name",
+                    models.CharField(
+                        db_index=True, max_length=100, verbose_name="Úloha"
+                    ),
+                ),
+                ("payload", models.JSONField(default=dict, verbose_name="Parametry")),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("pending", "Čeká"),
+                            ("running", "Běží"),
+                            ("done", "Hotovo"),
+                            ("failed", "Selhalo"),
+                        ],
+                        db_index=True,
+                        default="pending",
+                        max_length=20,
+                        verbose_name="Stav",
+                    ),
+                ),
+                (
+                    "attempts",
+                    models.PositiveSmallIntegerField(
+                        default=0, verbose_name="Počet pokusů"
+                    ),
+                ),
+                ("error", models.TextField(blank=True, verbose_name="Chyba")),
+                (
+                    "created_at",
+                    models.DateTimeField(auto_now_add=True, verbose_name="Vytvořeno"),
+                ),
+                (
+                    "started_at",
+                    models.DateTimeField(
+                        blank=True, null=True, verbose_name="Spuštěno"
+                    ),
+                ),
+                (
+                    "finished_at",
+                    models.DateTimeField(
+                        blank=True, null=True, verbose_name="Dokončeno"
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Úloha na pozadí",
+                "verbose_name_plural": "Úlohy na pozadí",
+                "ordering": ("-created_at",),
+            },
+        ),
+        migrations.AddField(
+            model_name="tasksolutionsubmission",
+            name="export_status",
+            field=models.CharField(
+                choices=[
+                    ("pending", "Čeká na zpracování"),
+                    ("ready", "Připraveno"),
+                    ("failed", "Zpracování selhalo"),
+                ],
+                db_index=True,
+                default="ready",
+                max_length=20,
+                verbose_name="Stav přípravy pro export",
+            ),
+        ),
+    ]
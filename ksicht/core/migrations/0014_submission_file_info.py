@@ -0,0 +1,47 @@
+# Generated by Django 5.0.7 on 2026-10-18 20:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0013_job_queue"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="tasksolutionsubmission",
+            name="file_hash",
+            field=models.CharField(
+                blank=True,
+                editable=False,
+                max_length=64,
+                verbose_name="SHA-256 souboru",
+            ),
+        ),
+        migrations.AddField(
+            model_name="tasksolutionsubmission",
+            name="file_size",
+            field=models.PositiveBigIntegerField(
+                blank=True, editable=False, null=True, verbose_name="Velikost souboru"
+            ),
+        ),
+        migrations.AddField(
+            model_name="tasksolutionsubmission",
+            name="is_valid_pdf",
+            field=models.BooleanField(
+                blank=True, editable=False, null=True, verbose_name="Platné PDF"
+            ),
+        ),
+        migrations.AddField(
+            model_name="tasksolutionsubmission",
+            name="page_count",
+            field=models.PositiveIntegerField(
+                blank=True,
+                editable=False,
+                help_text="Počet stran souboru připraveného pro export.",
+                null=True,
+                verbose_name="Počet stran",
+            ),
+        ),
+    ]
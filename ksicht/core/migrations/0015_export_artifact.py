@@ -0,0 +1,66 @@
+# Generated by Django 5.0.7 on 2026-10-18 20:26
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def schedule_export_bundles(apps, schema_editor):
+    GradeSeries = apps.get_model("core", "GradeSeries")
+    Job = apps.get_model("core", "Job")
+
+    Job.objects.bulk_create(
+        Job(
+            name="build_export_bundles",
+            payload={"series_id": str(series.pk)},
+            run_after=series.submission_deadline,
+        )
+        for series in GradeSeries.objects.filter(submission_deadline__gt=timezone.now())
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0014_submission_file_info"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ExportArtifact",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "key",
+                    models.CharField(max_length=255, unique=True, verbose_name="Klíč"),
+                ),
+                (
+                    "fingerprint",
+                    models.CharField(max_length=64, verbose_name="Otisk dat"),
+                ),
+                ("file", models.FileField(upload_to="exporty/", verbose_name="Soubor")),
+                (
+                    "updated_at",
+                    models.DateTimeField(auto_now=True, verbose_name="Sestaveno"),
+                ),
+            ],
+            options={
+                "verbose_name": "Připravený export",
+                "verbose_name_plural": "Připravené exporty",
+            },
+        ),
+        migrations.AddField(
+            model_name="job",
+            name="run_after",
+            field=models.DateTimeField(
+                blank=True, db_index=True, null=True, verbose_name="Spustit po"
+            ),
+        ),
+        migrations.RunPython(schedule_export_bundles, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.0.7 on 2026-10-18 21:40
+
+from django.db import migrations
+
+
+def schedule_rankings_rebuild(apps, schema_editor):
+    GradeSeries = apps.get_model("core", "GradeSeries")
+    Job = apps.get_model("core", "Job")
+
+    # Rankings of every series are rebuilt together with the following series of the
+    # grade, the first series of each grade covers them all.
+    first_series = {}
+
+    for series in GradeSeries.objects.filter(rankings_built_at=None).order_by(
+        "grade_id", "series"
+    ):
+        first_series.setdefault(series.grade_id, series)
+
+    Job.objects.bulk_create(
+        Job(name="rebuild_series_rankings", payload={"series_id": str(series.pk)})
+        for series in first_series.values()
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0015_export_artifact"),
+    ]
+
+    operations = [
+        migrations.RunPython(schedule_rankings_rebuild, migrations.RunPython.noop),
+    ]
@@ -1,27 +1,47 @@
-from datetime import date, datetime
+from contextlib import ExitStack
+from datetime import date, datetime, time as dt_time, timedelta
 from decimal import Decimal
+import hashlib
 import logging
+import math
 from operator import attrgetter
 import tempfile
-from typing import List, Optional
+import time
+from typing import Any, Dict, FrozenSet, List, Optional, Set, Tuple
 import uuid
 
 from cuser.models import AbstractCUser
 from django import forms
 from django.contrib.auth.models import Group as UserGroup
+from django.contrib.flatpages.models import FlatPage
+from django.core.cache import cache
 from django.core.files.base import File
 from django.core.validators import MinValueValidator
-from django.db import models
+from django.db import models, transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.db.models.functions import Coalesce, DenseRank, Rank, RowNumber
 from django.dispatch import receiver
 from django.urls import reverse
+from django.utils import timezone
 from django.utils.text import slugify
 from django_registration.signals import user_activated
 from imagekit.models import ImageSpecField
 from imagekit.processors import ResizeToFill
 import pydash as py_
 
-from ksicht.pdf import prepare_submission_for_export
+from ksicht.pdf import (
+    PreparedSubmission,
+    concatenate,
+    prepare_submission_for_export,
+    prepare_submissions_for_export,
+)
+from . import caching
 from .constants import SCHOOLS_CHOICES
+from .rankings import (
+    TASK_SCORE_ANNOTATION,
+    cumulative_max_scores,
+    listing_from_ranked,
+)
 
 
 logger = logging.getLogger(__name__)
@@ -32,7 +52,8 @@ class User(AbstractCUser):
         return f"{self.get_full_name()} <{self.get_username()}>"
 
     def is_participant(self):
-        return Participant.objects.filter(user=self).exists()
+        # Profile is loaded just once, `ParticipationMiddleware` has it preloaded for the request user.
+        return hasattr(self, "participant_profile")
 
 
 @receiver(user_activated)
@@ -41,10 +62,17 @@ def create_grade_application(sender, user: User, **kwargs):
         logger.error("User %r has been activated but has no participant profile", user)
         return
 
-    if current_grade := Grade.objects.get_current():
+    current_grade, _ = Grade.objects.get_current_with_series()
+
+    if current_grade:
         user.participant_profile.applications.add(current_grade)
 
 
+CURRENT_GRADE_CACHE_KEY = "grades::current"
+# Current grade gets re-checked at least this often (in seconds).
+CURRENT_GRADE_CACHE_MAX_AGE = 60 * 60
+
+
 class GradeManager(models.Manager):
     def get_current(self, current=None):
         current_date = current or date.today()
@@ -52,6 +80,52 @@ class GradeManager(models.Manager):
             start_date__lte=current_date, end_date__gte=current_date
         ).first()
 
+    def get_current_with_series(
+        self,
+    ) -> Tuple[Optional["Grade"], Optional["GradeSeries"]]:
+        """Return current grade together with its current series.
+
+        The result is cached until the next moment it could change on its own (a grade
+        starts or ends, a series deadline passes) or until the grade data get edited.
+        """
+        cache_key = caching.make_key(CURRENT_GRADE_CACHE_KEY, caching.GRADE)
+        cached = cache.get(cache_key)
+
+        if cached is None:
+            grade = self.get_current()
+            cached = (grade, grade.get_current_series() if grade else None)
+            cache.set(cache_key, cached, self._seconds_to_next_change(grade))
+
+        return cached
+
+    def _seconds_to_next_change(self, grade: Optional["Grade"]) -> int:
+        """Seconds until the current grade or series is due to change."""
+        today = date.today()
+        boundaries = [time.time() + CURRENT_GRADE_CACHE_MAX_AGE]
+
+        # Grades are current since the start of their first day till the end of the last one.
+        if next_start := (
+            self.filter(start_date__gt=today)
+            .order_by("start_date")
+            .values_list("start_date", flat=True)
+            .first()
+        ):
+            boundaries.append(datetime.combine(next_start, dt_time.min).timestamp())
+
+        if grade is not None:
+            boundaries.append(
+                datetime.combine(
+                    grade.end_date + timedelta(days=1), dt_time.min
+                ).timestamp()
+            )
+            boundaries.extend(
+                s.submission_deadline.timestamp()
+                for s in grade.prefetch_series()
+                if s.accepts_solution_submissions
+            )
+
+        return max(1, math.ceil(min(boundaries) - time.time()))
+
     def archive(self, current=None):
         current_date = current or date.today()
         return self.filter(end_date__lt=current_date)
@@ -144,6 +218,21 @@ class Grade(models.Model):
             )
         return self._prefetched_series
 
+    def get_max_scores(self) -> Dict[str, Optional[int]]:
+        """Return maximum reachable score for every series keyed by series number.
+
+        Maximum score of a series includes points of all the previous series as well.
+        Computed with a single query and kept on the instance afterwards.
+        """
+        if not hasattr(self, "_max_scores"):
+            self._max_scores = cumulative_max_scores(
+                Task.objects.filter(series__grade=self).values_list(
+                    "series__series", "points"
+                ),
+                [nr for nr, _ in GradeSeries.SERIES_CHOICES],
+            )
+        return self._max_scores
+
     def get_current_series(self):
         """Return first series that can still accept solution submissions from participants."""
         return (
@@ -213,6 +302,18 @@ class GradeSeries(models.Model):
         default=False,
         db_index=True,
     )
+    rankings_built_at = models.DateTimeField(
+        verbose_name="Výsledková listina sestavena",
+        null=True,
+        blank=True,
+        editable=False,
+    )
+    stickers_evaluated_at = models.DateTimeField(
+        verbose_name="Nálepky vyhodnoceny",
+        null=True,
+        blank=True,
+        editable=False,
+    )
 
     class Meta:
         unique_together = ("grade", "series")
@@ -224,9 +325,21 @@ class GradeSeries(models.Model):
             ("series_solution_envelopes_printout", "Export obálek s řešením"),
         )
 
+    # Deadline as loaded from the database, export bundles get rescheduled only once
+    # it changes.
+    _loaded_submission_deadline = None
+
     def __str__(self):
         return f"{self.get_series_display()} série"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_submission_deadline = instance.__dict__.get(
+            "submission_deadline"
+        )
+        return instance
+
     def get_absolute_url(self):
         return reverse(
             "core:series_detail", kwargs={"pk": self.pk, "grade_id": self.grade_id}
@@ -238,89 +351,68 @@ class GradeSeries(models.Model):
             self.submission_deadline.tzinfo
         )
 
-    def get_rankings(
-        self,
-        exclude_submissionless: bool = True,
-        _applications_cache: Optional[List["GradeApplication"]] = None,
-        _tasks_cache: Optional[List["Task"]] = None,
-        _submissions_cache: Optional[List["TaskSolutionSubmission"]] = None,
-    ):
+    def schedule_export_bundles(self):
+        """Let a background job build solution export bundles of all the series tasks.
+
+        The job runs once the submission deadline passes (or right away if it has passed
+        already), it's scheduled only once even if called repeatedly.
+        """
+        # Deadline that has passed already makes the job due right away. Unlike the
+        # current time, it doesn't change, so repeated calls don't update the job.
+        Job.objects.schedule(
+            BUILD_EXPORT_BUNDLES_JOB,
+            run_after=self.submission_deadline,
+            series_id=str(self.pk),
+        )
+
+    def schedule_rankings_rebuild(self):
+        """Let a background job rebuild ranking snapshots of this and the following series."""
+        Job.objects.schedule(
+            REBUILD_SERIES_RANKINGS_JOB, run_after=None, series_id=str(self.pk)
+        )
+
+    def get_rankings(self, exclude_submissionless: bool = True):
         """Calculate results for series.
 
         Adds detailed task listing for individual series tasks and a grand total with total score so far
         (this series and the previous ones).
 
         :param exclude_submissionless: Whether to exclude applications without any submission
-        :param _applications_cache: Optional cache of applications to use instead of fetching them from DB,
-            please note that `exclude_submissionless` is ignored when this is provided.
-        :param _tasks_cache: Optional cache of tasks to use instead of fetching them from DB.
-        :param _submissions_cache: Optional cache of submissions to use instead of fetching them from DB.
         :return: Dictionary with `max_score` and `listing` keys where `listing` is a list of tuples
-            with application, task scores and total score.
+            with application, rank, task scores and total score.
         """
-        # Only applications with an actual solution submission
-        if _applications_cache is None:
-            applications = self.grade.applications.select_related(
-                "participant__user"
-            ).order_by("created_at")
-
-            if exclude_submissionless:
-                applications = applications.exclude(solution_submissions=None)
-        else:
-            applications = _applications_cache
+        tasks = list(self.tasks.all())
+        applications = self.grade.applications.select_related("participant__user")
 
-        tasks = _tasks_cache or self.tasks.all()
-
-        if _submissions_cache is None:
-            submissions = TaskSolutionSubmission.objects.filter(
-                application__grade=self.grade, task__series__series__lte=self.series
-            )
-        else:
-            submissions = [
-                s
-                for s in _submissions_cache
-                if int(s.task.series.series) <= int(self.series)
-            ]
+        # Only applications with an actual solution submission
+        if exclude_submissionless:
+            applications = applications.exclude(solution_submissions=None)
 
-        scoring_dict = {
-            a: {"by_tasks": {t: None for t in tasks}, "total": Decimal("0")}
-            for a in applications
+        return {
+            "max_score": self.grade.get_max_scores().get(self.series),
+            "listing": listing_from_ranked(
+                applications.ranked(tasks, up_to_series=self.series), tasks
+            ),
         }
 
-        def _find_application(app_id):
-            return py_.find(applications, lambda a: a.pk == app_id)
-
-        def _find_task(task_id):
-            return py_.find(tasks, lambda t: t.pk == task_id)
-
-        for s in submissions:
-            a = _find_application(s.application_id)
-            t = _find_task(s.task_id)
-
-            if t:
-                scoring_dict[a]["by_tasks"][t] = s.score
-
-            scoring_dict[a]["total"] += s.score or Decimal("0")
+    def get_ranking_snapshot(self):
+        """Read results for series from the stored ranking snapshot.
 
-        scoring = [
-            (application, scores["by_tasks"], scores["total"])
-            for (application, scores) in scoring_dict.items()
-        ]
+        Returns the same structure as `get_rankings`. Until the snapshot gets built by
+        a background job, results are calculated on the fly.
+        """
+        if self.rankings_built_at is None:
+            return self.get_rankings()
 
-        # Attach ranks
-        sorted_scoring = [
-            # (application, rank, task scores, total score)
-            (row[0], index + 1, row[1], row[2])
-            for (index, row) in enumerate(
-                sorted(scoring, key=lambda r: r[2], reverse=True)
-            )
-        ]
+        tasks = list(self.tasks.all())
+        rows = self.ranking_rows.select_related("application__participant__user")
 
         return {
-            "max_score": Task.objects.filter(
-                series__grade=self.grade, series__series__lte=self.series
-            ).aggregate(models.Sum("points"))["points__sum"],
-            "listing": sorted_scoring,
+            "max_score": self.grade.get_max_scores().get(self.series),
+            "listing": [
+                (row.application, row.rank, row.get_task_scores(tasks), row.total_score)
+                for row in rows
+            ],
         }
 
     def tasks_with_submission_count(self):
@@ -331,6 +423,102 @@ class GradeSeries(models.Model):
         )
 
 
+class SeriesRankingManager(models.Manager):
+    def rebuild(self, series: GradeSeries):
+        """Store current rankings of the series, touching only the rows that have changed."""
+        with transaction.atomic():
+            # Rebuilds of the same series wait for each other instead of clashing on the
+            # unique rows.
+            GradeSeries.objects.select_for_update().filter(pk=series.pk).exists()
+
+            rankings = series.get_rankings()
+            existing = {row.application_id: row for row in self.filter(series=series)}
+            to_create = []
+            to_update = []
+
+            for application, rank, task_scores, total_score in rankings["listing"]:
+                values = {
+                    "rank": rank,
+                    "task_scores": {
+                        str(t.pk): None if score is None else str(score)
+                        for t, score in task_scores.items()
+                    },
+                    "total_score": total_score,
+                }
+                row = existing.pop(application.pk, None)
+
+                if row is None:
+                    to_create.append(
+                        self.model(series=series, application=application, **values)
+                    )
+                elif any(
+                    getattr(row, field) != value for field, value in values.items()
+                ):
+                    for field, value in values.items():
+                        setattr(row, field, value)
+                    to_update.append(row)
+
+            self.filter(pk__in=[row.pk for row in existing.values()]).delete()
+            self.bulk_update(to_update, ("rank", "task_scores", "total_score"))
+            self.bulk_create(to_create)
+            GradeSeries.objects.filter(pk=series.pk).update(
+                rankings_built_at=timezone.now()
+            )
+
+    def rebuild_from(self, series: GradeSeries):
+        """Rebuild rankings of the series and all the following series of the grade.
+
+        Total score is cumulative, so any score change affects the following series too.
+        """
+        for s in GradeSeries.objects.filter(
+            grade_id=series.grade_id, series__gte=series.series
+        ).select_related("grade"):
+            self.rebuild(s)
+
+
+class SeriesRanking(models.Model):
+    """Stored snapshot of a single row of the series results."""
+
+    series = models.ForeignKey(
+        GradeSeries,
+        verbose_name="Série",
+        on_delete=models.CASCADE,
+        related_name="ranking_rows",
+    )
+    application = models.ForeignKey(
+        "GradeApplication",
+        verbose_name="Přihláška",
+        on_delete=models.CASCADE,
+        related_name="series_rankings",
+    )
+    rank = models.PositiveIntegerField(verbose_name="Pořadí", null=False)
+    task_scores = models.JSONField(verbose_name="Skóre za úlohy", default=dict)
+    total_score = models.DecimalField(
+        verbose_name="Celkové skóre", max_digits=7, decimal_places=2, null=False
+    )
+
+    objects = SeriesRankingManager()
+
+    class Meta:
+        verbose_name = "Umístění v sérii"
+        verbose_name_plural = "Umístění v sériích"
+        ordering = ("series", "rank")
+        unique_together = ("series", "application")
+
+    def __str__(self):
+        return f"{self.rank}. místo přihlášky <{self.application_id}> v sérii <{self.series_id}>"
+
+    def get_task_scores(self, tasks: List["Task"]):
+        """Map given tasks to stored scores."""
+        scores = {}
+
+        for t in tasks:
+            score = self.task_scores.get(str(t.pk))
+            scores[t] = None if score is None else Decimal(score)
+
+        return scores
+
+
 class GradeSeriesAttachment(models.Model):
     title = models.CharField(verbose_name="Název", max_length=255, null=False)
     file = models.FileField(
@@ -392,6 +580,89 @@ class Task(models.Model):
     def __str__(self):
         return str(self.title)
 
+    def get_export_submissions(self):
+        """Prepare submitted files for export.
+
+        Preparation is only done for submissions the background job hasn't handled yet.
+
+        :return: Tuple of export-ready submissions (in the order of export) and the ones
+            that failed to be prepared.
+        """
+        submissions = (
+            self.solution_submissions.select_related(
+                "task", "application__participant__user"
+            )
+            .exclude(file="")
+            .order_by(
+                "application__participant__user__last_name",
+                "application__participant__user__first_name",
+            )
+        )
+        ready, failed = [], []
+
+        for s in submissions:
+            if not s.file:
+                continue
+
+            try:
+                s.ensure_export_ready()
+            except Exception:
+                failed.append(s)
+            else:
+                ready.append(s)
+
+        return ready, failed
+
+    def get_export_bundle_key(self, as_duplex: bool = False) -> str:
+        return TASK_EXPORT_BUNDLE_KEY.format(
+            self.pk, "duplex" if as_duplex else "normal"
+        )
+
+    @staticmethod
+    def get_export_fingerprint(submissions: List["TaskSolutionSubmission"]) -> str:
+        """Identify export bundle made of given export-ready submissions."""
+        digest = hashlib.sha256()
+
+        for s in submissions:
+            digest.update(
+                f"{s.pk}:{s.file_hash}:{s.file_for_export_normal.name}:{s.file_for_export_duplex.name}\n".encode(
+                    "utf8"
+                )
+            )
+
+        return digest.hexdigest()
+
+    def build_export_bundle(
+        self, submissions: List["TaskSolutionSubmission"], as_duplex: bool, out_file
+    ):
+        """Merge export variants of given submissions into a single PDF file."""
+        return concatenate(
+            [s.get_export_file(as_duplex) for s in submissions], out_file, as_duplex
+        )
+
+    def store_export_bundles(self):
+        """Build and store export bundles of the task unless they are up to date already."""
+        submissions, _ = self.get_export_submissions()
+
+        # There's nothing to export, view won't ask for the bundle.
+        if not submissions:
+            return
+
+        fingerprint = self.get_export_fingerprint(submissions)
+
+        for as_duplex in (False, True):
+            key = self.get_export_bundle_key(as_duplex)
+
+            if ExportArtifact.objects.get_fresh(key, fingerprint):
+                continue
+
+            with tempfile.TemporaryFile() as out_file:
+                self.build_export_bundle(submissions, as_duplex, out_file)
+                out_file.seek(0)
+                ExportArtifact.objects.store(
+                    key, fingerprint, out_file, f"{key.replace(':', '_')}.pdf"
+                )
+
 
 class ParticipantManager(models.Manager):
     def active_in_series(self, current_series):
@@ -532,6 +803,61 @@ class Participant(models.Model):
         return f"{self.user.get_full_name() or self.user.email}"
 
 
+class GradeApplicationQuerySet(models.QuerySet):
+    def ranked(
+        self,
+        tasks: List["Task"],
+        up_to_series: Optional[str] = None,
+        with_shared_ranks: bool = False,
+    ):
+        """Annotate scores and ranks computed by the database, ordered by rank.
+
+        Annotations:
+        - `task_score_<i>` score of the submission for i-th of `tasks` (or None)
+        - `total_score` sum of all submission scores up to (and including) series `up_to_series`
+        - `rank` position in results, ties are resolved by the application date
+
+        With `with_shared_ranks`, also:
+        - `shared_rank` position shared by applications with the same total score (RANK)
+        - `dense_rank` position shared by applications with the same total score without gaps (DENSE_RANK)
+        """
+        score_field = models.DecimalField(max_digits=7, decimal_places=2)
+        total_filter = (
+            models.Q(solution_submissions__task__series__series__lte=up_to_series)
+            if up_to_series is not None
+            else None
+        )
+        by_total_score = models.F("total_score").desc()
+
+        scored = self.annotate(
+            **{
+                TASK_SCORE_ANNOTATION.format(i): models.Sum(
+                    "solution_submissions__score",
+                    filter=models.Q(solution_submissions__task_id=t.pk),
+                )
+                for i, t in enumerate(tasks)
+            },
+            total_score=Coalesce(
+                models.Sum("solution_submissions__score", filter=total_filter),
+                models.Value(Decimal("0")),
+                output_field=score_field,
+            ),
+        )
+
+        ranks = {
+            "rank": models.Window(
+                RowNumber(),
+                order_by=(by_total_score, models.F("created_at").asc(), "pk"),
+            )
+        }
+
+        if with_shared_ranks:
+            ranks["shared_rank"] = models.Window(Rank(), order_by=(by_total_score,))
+            ranks["dense_rank"] = models.Window(DenseRank(), order_by=(by_total_score,))
+
+        return scored.annotate(**ranks).order_by("rank")
+
+
 class GradeApplication(models.Model):
     GRADE_CHOICES = (
         ("4", "4."),
@@ -550,6 +876,8 @@ class GradeApplication(models.Model):
     )
     created_at = models.DateTimeField(verbose_name="Datum vytvoření", auto_now_add=True)
 
+    objects = GradeApplicationQuerySet.as_manager()
+
     class Meta:
         verbose_name = "Přihláška do ročníku"
         verbose_name_plural = "Přihlášky do ročníku"
@@ -558,6 +886,26 @@ class GradeApplication(models.Model):
         return f"Přihláška <{self.participant.user}> do ročníku <{self.grade}> z {self.created_at}"
 
 
+EXPORT_PENDING = "pending"
+EXPORT_READY = "ready"
+EXPORT_FAILED = "failed"
+EXPORT_STATUS_CHOICES = (
+    (EXPORT_PENDING, "Čeká na zpracování"),
+    (EXPORT_READY, "Připraveno"),
+    (EXPORT_FAILED, "Zpracování selhalo"),
+)
+# Fields written by export preparation, the rest of the submission is left untouched.
+EXPORT_FIELDS = (
+    "file_for_export_normal",
+    "file_for_export_duplex",
+    "page_count",
+    "file_size",
+    "file_hash",
+    "is_valid_pdf",
+    "export_status",
+)
+
+
 class TaskSolutionSubmission(models.Model):
     application = models.ForeignKey(
         GradeApplication,
@@ -598,6 +946,29 @@ class TaskSolutionSubmission(models.Model):
         verbose_name="Skóre", max_digits=5, decimal_places=2, null=True, blank=True
     )
     submitted_at = models.DateTimeField(verbose_name="Datum nahrání", auto_now_add=True)
+    page_count = models.PositiveIntegerField(
+        verbose_name="Počet stran",
+        help_text="Počet stran souboru připraveného pro export.",
+        null=True,
+        blank=True,
+        editable=False,
+    )
+    file_size = models.PositiveBigIntegerField(
+        verbose_name="Velikost souboru", null=True, blank=True, editable=False
+    )
+    file_hash = models.CharField(
+        verbose_name="SHA-256 souboru", max_length=64, blank=True, editable=False
+    )
+    is_valid_pdf = models.BooleanField(
+        verbose_name="Platné PDF", null=True, blank=True, editable=False
+    )
+    export_status = models.CharField(
+        verbose_name="Stav přípravy pro export",
+        max_length=20,
+        choices=EXPORT_STATUS_CHOICES,
+        default=EXPORT_READY,
+        db_index=True,
+    )
     stickers = models.ManyToManyField(
         "Sticker", blank=True, related_name="solution_uses"
     )
@@ -624,6 +995,42 @@ class TaskSolutionSubmission(models.Model):
 
         return is_solution_author and solution_change_allowed
 
+    def get_export_label(self):
+        return f"Řešitel: {self.application.participant.get_full_name()}       Úloha č. {self.task.nr}".encode(
+            "utf8"
+        )
+
+    def set_file_info(self, prepared: PreparedSubmission):
+        """Remember details of the uploaded file, so that it doesn't need to be opened again."""
+        digest = hashlib.sha256()
+        size = 0
+
+        for chunk in self.file.chunks():
+            digest.update(chunk)
+            size += len(chunk)
+
+        self.file_size = size
+        self.file_hash = digest.hexdigest()
+        self.page_count = prepared.page_count
+        self.is_valid_pdf = prepared.is_valid
+
+    def save_export_variants(self, file_normal, file_duplex):
+        """Store export variant files, the caller saves the fields (see `EXPORT_FIELDS`)."""
+        self.file_for_export_normal.save(
+            f"submission_{self.application.pk}_{self.task.nr}_normal.pdf",
+            File(file_normal),
+            save=False,
+        )
+        self.file_for_export_duplex.save(
+            f"submission_{self.application.pk}_{self.task.nr}_duplex.pdf",
+            File(file_duplex),
+            save=False,
+        )
+
+    def get_export_file(self, as_duplex: bool = False):
+        """Export variant for the requested print mode."""
+        return self.file_for_export_duplex if as_duplex else self.file_for_export_normal
+
     def prepare_for_export(self):
         """Use uploaded file to prepare export-ready variants (normal and duplex)."""
         logger.info(
@@ -633,33 +1040,93 @@ class TaskSolutionSubmission(models.Model):
         )
 
         if self.file:
-            file_normal, file_duplex = prepare_submission_for_export(
-                in_file=self.file,
-                label=f"Řešitel: {self.application.participant.get_full_name()}       Úloha č. {self.task.nr}".encode(
-                    "utf8"
-                ),
-            )
-
-            with tempfile.TemporaryFile() as tf:
-                file_normal.write(tf)
-                self.file_for_export_normal.save(
-                    f"submission_{self.application.pk}_{self.task.nr}_normal.pdf",
-                    File(tf),
-                )
-
-            with tempfile.TemporaryFile() as tf:
-                file_duplex.write(tf)
-                self.file_for_export_duplex.save(
-                    f"submission_{self.application.pk}_{self.task.nr}_duplex.pdf",
-                    File(tf),
+            with tempfile.TemporaryFile() as file_normal, tempfile.TemporaryFile() as file_duplex:
+                prepared = prepare_submission_for_export(
+                    in_file=self.file,
+                    label=self.get_export_label(),
+                    out_normal=file_normal,
+                    out_duplex=file_duplex,
                 )
+                self.set_file_info(prepared)
+                self.save_export_variants(file_normal, file_duplex)
 
             logger.debug("Export versions prepared OK")
-            file_duplex.close()
-            file_normal.close()
         else:
             logger.warning("Export version prepare failed - no valid file available")
 
+    @classmethod
+    def prepare_all_for_export(cls, submissions: List["TaskSolutionSubmission"]):
+        """Prepare export-ready variants of many submissions, rendering all the labels at once.
+
+        Submissions without a file are skipped.
+        """
+        submissions = [s for s in submissions if s.file]
+
+        with ExitStack() as stack:
+            outputs = [
+                (
+                    stack.enter_context(tempfile.TemporaryFile()),
+                    stack.enter_context(tempfile.TemporaryFile()),
+                )
+                for _ in submissions
+            ]
+            all_prepared = prepare_submissions_for_export(
+                (s.file, s.get_export_label(), file_normal, file_duplex)
+                for s, (file_normal, file_duplex) in zip(submissions, outputs)
+            )
+
+            for s, prepared, (file_normal, file_duplex) in zip(
+                submissions, all_prepared, outputs
+            ):
+                s.set_file_info(prepared)
+                s.save_export_variants(file_normal, file_duplex)
+                s.export_status = EXPORT_READY
+                s.save(update_fields=EXPORT_FIELDS)
+
+    def schedule_export_preparation(self):
+        """Let a background job prepare export variants of the uploaded file."""
+        self.export_status = EXPORT_PENDING
+        self.save(update_fields=("export_status",))
+        Job.objects.enqueue(PREPARE_SUBMISSION_EXPORT_JOB, submission_id=self.pk)
+
+    def is_export_ready(self) -> bool:
+        return self.export_status == EXPORT_READY and bool(self.file_for_export_normal)
+
+    def ensure_export_ready(self):
+        """Prepare export variants right away unless a background job has done so already.
+
+        Submissions added through the administration don't get prepared on upload.
+        """
+        if self.is_export_ready():
+            return
+
+        try:
+            with transaction.atomic():
+                # Export view and job worker may get here at the same time, the other one
+                # waits for the row and then finds the variants ready.
+                locked = (
+                    TaskSolutionSubmission.objects.select_for_update()
+                    .only(*EXPORT_FIELDS)
+                    .filter(pk=self.pk)
+                    .first()
+                )
+
+                # Submission might have been deleted in the meantime.
+                if locked is None:
+                    return
+
+                if locked.is_export_ready():
+                    self.refresh_from_db(fields=EXPORT_FIELDS)
+                    return
+
+                self.prepare_for_export()
+                self.export_status = EXPORT_READY
+                self.save(update_fields=EXPORT_FIELDS)
+        except Exception:
+            self.export_status = EXPORT_FAILED
+            self.save(update_fields=("export_status",))
+            raise
+
 
 class StickerManager(models.Manager):
     def get_by_natural_key(self, nr):
@@ -692,6 +1159,27 @@ class Sticker(models.Model):
         return (self.nr,)
 
 
+class EventAttendeeQuerySet(models.QuerySet):
+    def with_rank(self, capacity: Optional[int]):
+        """Annotate signup order (`rank`) and whether the attendee is a substitute (`is_substitute`).
+
+        Everyone signed up after the event `capacity` has been reached is a substitute.
+        """
+        ranked = self.annotate(
+            rank=models.Window(RowNumber(), order_by=("signup_date", "pk"))
+        )
+
+        return ranked.annotate(
+            is_substitute=(
+                models.ExpressionWrapper(
+                    models.Q(rank__gt=capacity), output_field=models.BooleanField()
+                )
+                if capacity is not None
+                else models.Value(False)
+            )
+        ).order_by("signup_date", "pk")
+
+
 class EventAttendee(models.Model):
     user = models.ForeignKey(User, verbose_name="Účastník", on_delete=models.CASCADE)
     event = models.ForeignKey(
@@ -716,6 +1204,8 @@ class EventAttendee(models.Model):
         blank=True,
     )
 
+    objects = EventAttendeeQuerySet.as_manager()
+
     class Meta:
         verbose_name = "Přihláška na akci"
         verbose_name_plural = "Přihlášky na akce"
@@ -841,6 +1331,139 @@ class Event(models.Model):
         return self.enlistment_enabled and date.today() <= self.end_date
 
 
+# Cache key of closed grade summaries sticker resolvers use, see `stickers.engine`.
+STICKERS_GRADE_SUMMARY_CACHE_KEY = "stickers::grade_summary::{}"
+STICKERS_GRADE_SUMMARY_CACHE_MAX_AGE = 60 * 60 * 24
+
+# (application id, sticker id, source, resolver name, event id)
+StickerAwardKey = Tuple[Any, int, str, str, Optional[int]]
+
+
+class StickerAwardManager(models.Manager):
+    def sync(self, series: GradeSeries, awards: Set[StickerAwardKey]):
+        """Make the ledger of the series match `awards`, touching only the rows that have changed.
+
+        Awards granted before keep their original timestamp.
+
+        :return: Primary keys of applications whose awards have changed.
+        """
+        existing = {
+            tuple(row[1:]): row[0]
+            for row in self.filter(series=series).values_list(
+                "pk", "application_id", "sticker_id", "source", "resolver", "event_id"
+            )
+        }
+        to_delete = [pk for key, pk in existing.items() if key not in awards]
+        to_create = [
+            self.model(
+                series=series,
+                application_id=application_id,
+                sticker_id=sticker_id,
+                source=source,
+                resolver=resolver,
+                event_id=event_id,
+            )
+            for application_id, sticker_id, source, resolver, event_id in awards
+            if (application_id, sticker_id, source, resolver, event_id) not in existing
+        ]
+
+        with transaction.atomic():
+            self.filter(pk__in=to_delete).delete()
+            self.bulk_create(to_create)
+            GradeSeries.objects.filter(pk=series.pk).update(
+                stickers_evaluated_at=timezone.now()
+            )
+
+        return {key[0] for key in set(existing) ^ awards}
+
+    def invalidate_from(self, series: GradeSeries):
+        """Mark ledger of the series and all the following series of the grade as outdated."""
+        # Same as with the cache versions, data from before the change could get cached
+        # again by concurrent requests until the transaction commits.
+        transaction.on_commit(
+            lambda: cache.delete(
+                caching.make_key(
+                    STICKERS_GRADE_SUMMARY_CACHE_KEY.format(series.grade_id),
+                    caching.GRADE,
+                )
+            )
+        )
+        GradeSeries.objects.filter(
+            grade_id=series.grade_id, series__gte=series.series
+        ).update(stickers_evaluated_at=None)
+
+    def invalidate_for_event(self, event: "Event"):
+        """Mark ledger of the series event stickers are awarded in (and the following ones) as outdated.
+
+        Stickers of an event get to the series the event ends before (see
+        `stickers.engine.get_event_stickers`).
+        """
+        GradeSeries.objects.filter(
+            grade__end_date__gte=event.start_date,
+            submission_deadline__date__gte=event.end_date,
+        ).update(stickers_evaluated_at=None)
+
+
+class StickerAward(models.Model):
+    """Sticker granted to a participant within a series."""
+
+    SOURCE_RESOLVER = "resolver"
+    SOURCE_EVENT = "event"
+    SOURCE_HANDPICKED = "handpicked"
+    SOURCE_CHOICES = (
+        (SOURCE_RESOLVER, "Automaticky"),
+        (SOURCE_EVENT, "Za účast na akci"),
+        (SOURCE_HANDPICKED, "Ručně"),
+    )
+
+    series = models.ForeignKey(
+        GradeSeries,
+        verbose_name="Série",
+        on_delete=models.CASCADE,
+        related_name="sticker_awards",
+    )
+    application = models.ForeignKey(
+        GradeApplication,
+        verbose_name="Přihláška",
+        on_delete=models.CASCADE,
+        related_name="sticker_awards",
+    )
+    sticker = models.ForeignKey(
+        Sticker,
+        verbose_name="Nálepka",
+        on_delete=models.CASCADE,
+        related_name="awards",
+    )
+    source = models.CharField(
+        verbose_name="Způsob udělení", max_length=20, choices=SOURCE_CHOICES
+    )
+    resolver = models.CharField(
+        verbose_name="Pravidlo",
+        max_length=255,
+        blank=True,
+        help_text="Název pravidla, které nálepku udělilo automaticky.",
+    )
+    event = models.ForeignKey(
+        Event,
+        verbose_name="Akce",
+        null=True,
+        blank=True,
+        on_delete=models.CASCADE,
+        related_name="sticker_awards",
+    )
+    created_at = models.DateTimeField(verbose_name="Datum udělení", auto_now_add=True)
+
+    objects = StickerAwardManager()
+
+    class Meta:
+        verbose_name = "Udělená nálepka"
+        verbose_name_plural = "Udělené nálepky"
+        ordering = ("series", "application", "sticker")
+
+    def __str__(self):
+        return f"Nálepka {self.sticker_id} pro přihlášku <{self.application_id}> v sérii <{self.series_id}>"
+
+
 class FlatPageMeta(models.Model):
     flatpage = models.OneToOneField(
         to="flatpages.FlatPage",
@@ -871,18 +1494,31 @@ class FlatPageMeta(models.Model):
 
     def is_accessible_for(self, user):
         """Decide whether user should be allowed to display this page."""
-        allowed_groups = self.allowed_groups.all()
+        return self.is_accessible(
+            frozenset(g.pk for g in self.allowed_groups.all()), user
+        )
 
-        if len(allowed_groups) > 0 and (
-            not user.is_authenticated
-            or (
-                not user.is_superuser
-                and all(g not in allowed_groups for g in user.groups.all())
-            )
-        ):
+    @staticmethod
+    def is_accessible(allowed_group_ids: FrozenSet[int], user) -> bool:
+        """Decide whether user should be allowed to display page restricted to the groups.
+
+        No groups at all means the page is public.
+        """
+        if not allowed_group_ids:
+            return True
+
+        if not user.is_authenticated:
             return False
 
-        return True
+        return user.is_superuser or bool(allowed_group_ids & get_group_ids(user))
+
+
+def get_group_ids(user) -> FrozenSet[int]:
+    """Return primary keys of the user groups, loaded just once per user instance."""
+    if not hasattr(user, "_group_ids"):
+        user._group_ids = frozenset(user.groups.values_list("pk", flat=True))
+
+    return user._group_ids
 
 
 class TeamMember(models.Model):
@@ -918,3 +1554,284 @@ class TeamMember(models.Model):
 
     def __str__(self):
         return str(self.name)
+
+
+# Name of the job preparing export variants of a submission, see `ksicht.core.jobs`.
+PREPARE_SUBMISSION_EXPORT_JOB = "prepare_submission_export"
+BUILD_EXPORT_BUNDLES_JOB = "build_export_bundles"
+BUILD_SCHOOL_ENVELOPES_JOB = "build_school_envelopes"
+REBUILD_SERIES_RANKINGS_JOB = "rebuild_series_rankings"
+
+# Job running for longer than this has lost its worker (e.g. killed by a deploy).
+JOB_RUNNING_TIMEOUT = timedelta(hours=1)
+# Stale job is given up on after this many attempts, it likely kills the worker.
+JOB_MAX_ATTEMPTS = 3
+
+
+class JobQuerySet(models.QuerySet):
+    def enqueue(self, name: str, run_after: Optional[datetime] = None, **payload):
+        """Add job to the queue, workers pick it up once the current transaction commits.
+
+        Job with `run_after` set is postponed until then.
+        """
+        return self.create(name=name, payload=payload, run_after=run_after)
+
+    def schedule(self, name: str, run_after: Optional[datetime], **payload):
+        """Enqueue job unless the same one is pending already, then just move its `run_after`."""
+        job = self.filter(name=name, payload=payload, status=Job.STATUS_PENDING).first()
+
+        if job is None:
+            return self.enqueue(name, run_after=run_after, **payload)
+
+        if job.run_after != run_after:
+            job.run_after = run_after
+            job.save(update_fields=("run_after",))
+
+        return job
+
+    def stale(self):
+        """Running jobs whose worker must have died, see `JOB_RUNNING_TIMEOUT`."""
+        return self.filter(
+            status=Job.STATUS_RUNNING,
+            started_at__lt=timezone.now() - JOB_RUNNING_TIMEOUT,
+        )
+
+    def reclaim_stale(self) -> int:
+        """Return stale jobs to the queue, or fail them once they've used up their attempts.
+
+        :return: Number of jobs returned to the queue.
+        """
+        self.stale().filter(attempts__gte=JOB_MAX_ATTEMPTS).update(
+            status=Job.STATUS_FAILED,
+            error="Úloha nebyla dokončena, zpracování bylo nejspíš přerušeno.",
+            finished_at=timezone.now(),
+        )
+        return self.stale().update(status=Job.STATUS_PENDING)
+
+    def claim_next(self):
+        """Mark the oldest pending job as running and return it.
+
+        Rows locked by other workers are skipped, so several workers can run side by side.
+        """
+        with transaction.atomic():
+            job = (
+                self.select_for_update(skip_locked=True)
+                .filter(status=Job.STATUS_PENDING)
+                .filter(
+                    models.Q(run_after__isnull=True)
+                    | models.Q(run_after__lte=timezone.now())
+                )
+                .order_by("created_at", "pk")
+                .first()
+            )
+
+            if job is not None:
+                job.status = Job.STATUS_RUNNING
+                job.started_at = timezone.now()
+                job.attempts += 1
+                job.save(update_fields=("status", "started_at", "attempts"))
+
+        return job
+
+
+class Job(models.Model):
+    """Work item of the database backed background job queue."""
+
+    STATUS_PENDING = "pending"
+    STATUS_RUNNING = "running"
+    STATUS_DONE = "done"
+    STATUS_FAILED = "failed"
+    STATUS_CHOICES = (
+        (STATUS_PENDING, "Čeká"),
+        (STATUS_RUNNING, "Běží"),
+        (STATUS_DONE, "Hotovo"),
+        (STATUS_FAILED, "Selhalo"),
+    )
+
+    name = models.CharField(verbose_name="Úloha", max_length=100, db_index=True)
+    payload = models.JSONField(verbose_name="Parametry", default=dict)
+    status = models.CharField(
+        verbose_name="Stav",
+        max_length=20,
+        choices=STATUS_CHOICES,
+        default=STATUS_PENDING,
+        db_index=True,
+    )
+    attempts = models.PositiveSmallIntegerField(verbose_name="Počet pokusů", default=0)
+    error = models.TextField(verbose_name="Chyba", blank=True)
+    created_at = models.DateTimeField(verbose_name="Vytvořeno", auto_now_add=True)
+    run_after = models.DateTimeField(
+        verbose_name="Spustit po", null=True, blank=True, db_index=True
+    )
+    started_at = models.DateTimeField(verbose_name="Spuštěno", null=True, blank=True)
+    finished_at = models.DateTimeField(verbose_name="Dokončeno", null=True, blank=True)
+
+    objects = JobQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = "Úloha na pozadí"
+        verbose_name_plural = "Úlohy na pozadí"
+        ordering = ("-created_at",)
+
+    def __str__(self):
+        return f"{self.name} <{self.pk}>"
+
+
+@receiver(post_save, sender=GradeSeries)
+def schedule_series_export_bundles(
+    sender, instance: GradeSeries, created: bool, update_fields=None, **kwargs
+):
+    if update_fields is not None and "submission_deadline" not in update_fields:
+        return
+
+    if not created and (
+        instance._loaded_submission_deadline == instance.submission_deadline
+    ):
+        return
+
+    # Deadline might have been assigned as a string or a date, use the stored value.
+    series = GradeSeries.objects.only("submission_deadline").get(pk=instance.pk)
+    series.schedule_export_bundles()
+    instance._loaded_submission_deadline = series.submission_deadline
+
+
+# Submission fields rankings and stickers are evaluated from.
+SUBMISSION_RESULT_FIELDS = {"score", "file", "submitted_at"}
+
+
+@receiver([post_save, post_delete], sender=TaskSolutionSubmission)
+def submission_changed(sender, instance: TaskSolutionSubmission, **kwargs):
+    # Edits made anywhere (e.g. admin) must get to the results and stickers eventually.
+    update_fields = kwargs.get("update_fields")
+
+    if update_fields is not None and not SUBMISSION_RESULT_FIELDS & set(update_fields):
+        return
+
+    series = GradeSeries.objects.filter(tasks=instance.task_id).first()
+
+    if series is not None:
+        series.schedule_rankings_rebuild()
+        StickerAward.objects.invalidate_from(series)
+
+
+@receiver(m2m_changed, sender=TaskSolutionSubmission.stickers.through)
+def submission_stickers_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if not action.startswith("post_"):
+        return
+
+    if reverse:
+        # Submissions of a sticker changed, e.g. `sticker.solution_uses.add(...)`.
+        series_list = GradeSeries.objects.filter(
+            tasks__solution_submissions__in=pk_set or ()
+        ).distinct()
+    else:
+        series_list = GradeSeries.objects.filter(tasks=instance.task_id)
+
+    for series in series_list:
+        StickerAward.objects.invalidate_from(series)
+
+
+def _grade_applications_changed(grade_id):
+    series = GradeSeries.objects.filter(grade_id=grade_id).order_by("series").first()
+
+    if series is not None:
+        series.schedule_rankings_rebuild()
+        StickerAward.objects.invalidate_from(series)
+
+
+@receiver([post_save, post_delete], sender=GradeApplication)
+def application_changed(sender, instance: GradeApplication, **kwargs):
+    _grade_applications_changed(instance.grade_id)
+
+
+@receiver(m2m_changed, sender=Participant.applications.through)
+def applications_changed(sender, instance, action, pk_set, **kwargs):
+    # Applications are mostly created through `grade.participants.add(...)` or
+    # `participant.applications.add(...)`, which only send `m2m_changed`.
+    if action not in ("post_add", "post_remove", "pre_clear"):
+        return
+
+    if isinstance(instance, Grade):
+        grade_ids = {instance.pk}
+    elif pk_set is not None:
+        grade_ids = pk_set
+    else:
+        grade_ids = set(instance.applications.values_list("pk", flat=True))
+
+    for grade_id in grade_ids:
+        _grade_applications_changed(grade_id)
+
+
+@receiver([post_save, post_delete], sender=Event)
+@receiver([post_save, post_delete, m2m_changed], sender=EventAttendee)
+@receiver(m2m_changed, sender=Event.reward_stickers.through)
+def event_changed(sender, instance, action=None, reverse=False, pk_set=None, **kwargs):
+    if action is not None and not action.startswith("post_"):
+        return
+
+    if isinstance(instance, Event):
+        events = [instance]
+    elif isinstance(instance, EventAttendee):
+        events = Event.objects.filter(pk=instance.event_id)
+    else:
+        # Reverse side of the relation, e.g. `user.events.add(...)`.
+        events = Event.objects.filter(pk__in=pk_set or ())
+
+    for event in events:
+        StickerAward.objects.invalidate_for_event(event)
+
+
+TASK_EXPORT_BUNDLE_KEY = "task_solutions::{}::{}"
+
+
+class ExportArtifactQuerySet(models.QuerySet):
+    def get_fresh(self, key: str, fingerprint: str) -> Optional["ExportArtifact"]:
+        """Return stored artifact unless its content has been built from different data."""
+        return self.filter(key=key, fingerprint=fingerprint).first()
+
+    def store(self, key: str, fingerprint: str, content, filename: str):
+        """Store file under given key, replacing the previous one."""
+        artifact = self.filter(key=key).first() or ExportArtifact(key=key)
+
+        if artifact.file:
+            artifact.file.delete(save=False)
+
+        artifact.fingerprint = fingerprint
+        artifact.file.save(filename, File(content), save=False)
+        artifact.save()
+
+        return artifact
+
+
+class ExportArtifact(models.Model):
+    """Pre-built export file, e.g. merged solutions of a task.
+
+    Every artifact is identified by a `key` and remembers a fingerprint of the data it's
+    been built from, so that a stale one is never served.
+    """
+
+    key = models.CharField(verbose_name="Klíč", max_length=255, unique=True)
+    fingerprint = models.CharField(verbose_name="Otisk dat", max_length=64)
+    file = models.FileField(verbose_name="Soubor", upload_to="exporty/")
+    updated_at = models.DateTimeField(verbose_name="Sestaveno", auto_now=True)
+
+    objects = ExportArtifactQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = "Připravený export"
+        verbose_name_plural = "Připravené exporty"
+
+    def __str__(self):
+        return self.key
+
+
+# Data cached with versioned keys (see `ksicht.core.caching`) of a namespace depend
+# on these models and get stale whenever any of them changes.
+caching.bump_on_change(caching.GRADE, Grade, GradeSeries, GradeSeriesAttachment, Task)
+caching.bump_on_change(
+    caching.FLATPAGE,
+    FlatPage,
+    FlatPage.sites.through,
+    FlatPageMeta,
+    FlatPageMeta.allowed_groups.through,
+)
@@ -0,0 +1,88 @@
+from decimal import Decimal
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+
+# (application, rank, task scores, total score)
+RankingRow = Tuple[Any, int, Dict[Any, Optional[Decimal]], Decimal]
+
+# Name of the annotation holding score for i-th task, see `GradeApplicationQuerySet.ranked`.
+TASK_SCORE_ANNOTATION = "task_score_{}"
+
+
+def rank_applications(
+    applications: Iterable[Any], tasks: Sequence[Any], submissions: Iterable[Any]
+) -> List[RankingRow]:
+    """Rank applications by the total score of their submissions.
+
+    Applications and tasks are indexed by their primary keys so that every submission
+    is resolved with a constant time lookup and submissions are walked exactly once.
+
+    Submissions of tasks not contained in `tasks` count towards the total score only
+    (e.g. tasks of the previous series). Submissions of unknown applications are ignored.
+    """
+    tasks_by_pk = {t.pk: t for t in tasks}
+    empty_by_tasks = dict.fromkeys(tasks)
+    scoring_by_pk = {
+        a.pk: (a, empty_by_tasks.copy(), [Decimal("0")]) for a in applications
+    }
+
+    for s in submissions:
+        row = scoring_by_pk.get(s.application_id)
+
+        if row is None:
+            continue
+
+        _, by_tasks, total = row
+        t = tasks_by_pk.get(s.task_id)
+
+        if t is not None:
+            by_tasks[t] = s.score
+
+        total[0] += s.score or Decimal("0")
+
+    # Sorting is stable, so applications with the same total keep their original order.
+    sorted_scoring = sorted(
+        scoring_by_pk.values(), key=lambda row: row[2][0], reverse=True
+    )
+
+    return [
+        (application, index + 1, by_tasks, total[0])
+        for index, (application, by_tasks, total) in enumerate(sorted_scoring)
+    ]
+
+
+def listing_from_ranked(
+    applications: Iterable[Any], tasks: Sequence[Any]
+) -> List[RankingRow]:
+    """Turn applications annotated by `GradeApplicationQuerySet.ranked` into ranking rows."""
+    return [
+        (
+            application,
+            application.rank,
+            {
+                t: getattr(application, TASK_SCORE_ANNOTATION.format(i))
+                for i, t in enumerate(tasks)
+            },
+            application.total_score,
+        )
+        for application in applications
+    ]
+
+
+def cumulative_max_scores(
+    points_by_series: Iterable[Tuple[str, int]], series_nrs: Iterable[str]
+) -> Dict[str, Optional[int]]:
+    """Sum task points of every series and all the series before it.
+
+    :param points_by_series: Pairs of series number and task points.
+    :param series_nrs: Series numbers to compute the maximum score for.
+    :return: Maximum score keyed by series number, `None` when there are no tasks yet.
+    """
+    points_by_series = list(points_by_series)
+    max_scores = {}
+
+    for nr in series_nrs:
+        points = [p for s, p in points_by_series if int(s) <= int(nr)]
+        max_scores[nr] = sum(points) if points else None
+
+    return max_scores
@@ -1,7 +1,14 @@
-from typing import List, Set, Tuple
+from collections.abc import Mapping, Sequence
+from datetime import date
+from decimal import Decimal
+from typing import Dict, List, Set, Tuple
+
+from django.core.cache import cache
+from django.db.models import Count
 
 from . import registry, types
-from .. import models
+from .. import caching, models
+from ..rankings import rank_applications
 
 
 def resolve_stickers(context: types.StickerContext):
@@ -15,74 +22,234 @@ def resolve_stickers(context: types.StickerContext):
     return entitled_to
 
 
-def _grade_details(grade: models.Grade) -> types.GradeDetails:
-    """Get details of the grade."""
-    applications = list(
-        grade.applications.order_by("created_at").select_related("participant__user")
-    )
-    series = list(
-        models.GradeSeries.objects.filter(grade=grade)
-        .select_related("grade")
-        .prefetch_related("grade__applications")
-    )
-    tasks = list(models.Task.objects.filter(series__grade=grade))
-    submitted_solutions = models.TaskSolutionSubmission.objects.filter(
-        task__series__grade=grade
-    ).select_related("task__series")
-
-    rankings_by_series = {
-        s: s.get_rankings(
-            _applications_cache=applications,
-            _tasks_cache=[t for t in tasks if t.series_id == s.pk],
-            _submissions_cache=[sol for sol in submitted_solutions],
+APPLICATION_FIELDS = (
+    "id",
+    "grade_id",
+    "participant_id",
+    "participant_current_grade",
+    "created_at",
+)
+
+
+def _load_grade_data(grade: models.Grade) -> types.GradeData:
+    """Load everything grade details are built from in a compact, cacheable form."""
+    return {
+        "series": list(
+            models.GradeSeries.objects.filter(grade=grade).select_related("grade")
+        ),
+        "tasks": list(models.Task.objects.filter(series__grade=grade)),
+        "max_scores": grade.get_max_scores(),
+        "application_rows": list(
+            grade.applications.order_by("created_at").values_list(*APPLICATION_FIELDS)
+        ),
+        "submission_rows": [
+            types.SubmissionRow._make(row)
+            for row in models.TaskSolutionSubmission.objects.filter(
+                task__series__grade=grade
+            ).values_list(*types.SubmissionRow._fields)
+        ],
+    }
+
+
+def _grade_details(data: types.GradeData) -> types.GradeDetails:
+    """Get details of the grade.
+
+    Every submission is visited once and filed under its application, series and task.
+    Applications come with a participant instance that has only its primary key loaded.
+    """
+    series = data["series"]
+    tasks = data["tasks"]
+    applications = []
+
+    for row in data["application_rows"]:
+        application = models.GradeApplication.from_db(None, APPLICATION_FIELDS, row)
+        application.participant = models.Participant.from_db(
+            None, ("user_id",), (application.participant_id,)
         )
-        for s in series
+        applications.append(application)
+
+    series_by_pk = {s.pk: s for s in series}
+    tasks_by_pk = {t.pk: t for t in tasks}
+    tasks_by_series: Dict[models.GradeSeries, List[models.Task]] = {
+        s: [] for s in series
+    }
+    submissions_by_series: Dict[models.GradeSeries, List[types.SubmissionRow]] = {
+        s: [] for s in series
     }
 
+    for t in tasks:
+        tasks_by_series[series_by_pk[t.series_id]].append(t)
+
+    # Copying a dict doesn't re-hash its (model instance) keys, unlike building a new one.
+    empty_by_tasks = dict.fromkeys(tasks)
+    submissions_by_application: Dict[int, types.Submissions] = {
+        a.pk: {
+            "all": [],
+            "by_series": {s: [] for s in series},
+            "by_tasks": empty_by_tasks.copy(),
+        }
+        for a in applications
+    }
+
+    for sub in data["submission_rows"]:
+        submissions = submissions_by_application.get(sub.application_id)
+
+        if submissions is None:
+            continue
+
+        task = tasks_by_pk[sub.task_id]
+        task_series = series_by_pk[task.series_id]
+        submissions["all"].append(sub)
+        submissions["by_series"][task_series].append(sub)
+        submissions_by_series[task_series].append(sub)
+
+        if submissions["by_tasks"][task] is None:
+            submissions["by_tasks"][task] = sub
+
+    # Series results include score from all the previous series.
+    rankings_by_series = {}
+    submissions_so_far: List[types.SubmissionRow] = []
+
+    for s in series:
+        submissions_so_far.extend(submissions_by_series[s])
+        rankings_by_series[s] = (
+            data["max_scores"].get(s.series),
+            {
+                row[0].pk: row
+                for row in rank_applications(
+                    applications, tasks_by_series[s], submissions_so_far
+                )
+            },
+        )
+
     def _series_details(
         series: models.GradeSeries, application: models.GradeApplication
     ) -> types.SeriesDetails:
-        rankings = rankings_by_series[series]
-        application_ranking = next(
-            row for row in rankings["listing"] if row[0].pk == application.pk
-        )
+        max_score, rows_by_application = rankings_by_series[series]
+        _, rank, _, score = rows_by_application[application.pk]
         return {
-            "rank": application_ranking[1],
-            "score": application_ranking[3],
-            "max_score": rankings["max_score"],
+            "rank": rank,
+            "score": score,
+            "max_score": max_score,
         }
 
     grade_details: types.GradeDetails = {
+        "applications": applications,
         "series": series,
-        "tasks": {s: [t for t in tasks if t.series_id == s.pk] for s in series},
+        "tasks": tasks_by_series,
         "by_participant": {},
     }
 
     for application in applications:
-        submissions = [
-            s for s in submitted_solutions if s.application_id == application.pk
-        ]
-
         grade_details["by_participant"][application.participant] = {
             "series": {s: _series_details(s, application) for s in series},
-            "submissions": {
-                "all": submissions,
-                "by_series": {
-                    s: list(sub for sub in submissions if sub.task.series_id == s.pk)
-                    for s in series
-                },
-                "by_tasks": {
-                    t: next((sub for sub in submissions if sub.task_id == t.pk), None)
-                    for t in tasks
-                },
-            },
+            "submissions": submissions_by_application[application.pk],
         }
 
     return grade_details
 
 
-def get_eligibility(current_series: models.GradeSeries):
-    """Find out sticker eligibility for every participant in the series."""
+def _grade_summary(data: types.GradeData) -> types.GradeSummary:
+    """Count tasks of the grade and submissions of every participant."""
+    participant_ids = {row[0]: row[2] for row in data["application_rows"]}
+    submission_counts = dict.fromkeys(participant_ids.values(), 0)
+
+    for sub in data["submission_rows"]:
+        if sub.application_id in participant_ids:
+            submission_counts[participant_ids[sub.application_id]] += 1
+
+    return {"task_count": len(data["tasks"]), "submission_counts": submission_counts}
+
+
+def _load_grade_summary(grade: models.Grade) -> types.GradeSummary:
+    """Count the same as `_grade_summary` in the database, without loading the grade data."""
+    return {
+        "task_count": models.Task.objects.filter(series__grade=grade).count(),
+        "submission_counts": dict(
+            models.TaskSolutionSubmission.objects.filter(application__grade=grade)
+            .values("application__participant_id")
+            .annotate(count=Count("pk"))
+            .values_list("application__participant_id", "count")
+        ),
+    }
+
+
+def _cached_grade_summary(grade: models.Grade) -> types.GradeSummary:
+    """Load summary of a closed grade, cached as closed grades rarely change.
+
+    Submission changes drop it right away (see `StickerAwardManager.invalidate_from`),
+    anything else gets picked up once the cache entry expires.
+    """
+    cache_key = caching.make_key(
+        models.STICKERS_GRADE_SUMMARY_CACHE_KEY.format(grade.pk), caching.GRADE
+    )
+    summary = cache.get(cache_key)
+
+    if summary is None:
+        summary = _load_grade_summary(grade)
+        cache.set(cache_key, summary, models.STICKERS_GRADE_SUMMARY_CACHE_MAX_AGE)
+
+    return summary
+
+
+class LazyGrades(Mapping):
+    """Grade details by index (0 = current grade), each built on first access.
+
+    Details of the previous grades are only needed by few resolvers (and just in the last series),
+    so there is no need to build them every time.
+    """
+
+    def __init__(self, grades: List[models.Grade]):
+        self._grades = grades
+        self._data: Dict[int, types.GradeData] = {}
+        self._details: Dict[int, types.GradeDetails] = {}
+        self.summaries = LazyGradeSummaries(self)
+
+    def get_data(self, index: int) -> types.GradeData:
+        if index not in self._data:
+            self._data[index] = _load_grade_data(self._grades[index])
+        return self._data[index]
+
+    def get_summary(self, index: int) -> types.GradeSummary:
+        grade = self._grades[index]
+
+        if index in self._data or grade.end_date >= date.today():
+            return _grade_summary(self.get_data(index))
+
+        return _cached_grade_summary(grade)
+
+    def __getitem__(self, index: int) -> types.GradeDetails:
+        if index not in self._details:
+            self._details[index] = _grade_details(self.get_data(index))
+        return self._details[index]
+
+    def __iter__(self):
+        return iter(range(len(self._grades)))
+
+    def __len__(self):
+        return len(self._grades)
+
+
+class LazyGradeSummaries(Sequence):
+    """Grade summaries by index (0 = current grade), built from the data `LazyGrades` loads."""
+
+    def __init__(self, grades: LazyGrades):
+        self._grades = grades
+        self._summaries: Dict[int, types.GradeSummary] = {}
+
+    def __getitem__(self, index: int) -> types.GradeSummary:
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        if index not in self._summaries:
+            self._summaries[index] = self._grades.get_summary(index)
+        return self._summaries[index]
+
+    def __len__(self):
+        return len(self._grades)
+
+
+def get_batch(current_series: models.GradeSeries) -> types.StickerBatch:
+    """Collect everything resolvers need for all participants of the series."""
 
     current_grade = current_series.grade
     grades = [current_grade]
@@ -91,30 +258,167 @@ def get_eligibility(current_series: models.GradeSeries):
             "-end_date"
         )[:3]
     )
-    applications: List[models.GradeApplication] = list(
-        current_grade.applications.select_related("participant__user")
+    base_context = {"by_grades": LazyGrades(grades), "shared": {}}
+    current_grade_details = base_context["by_grades"][0]
+    is_last_series = (
+        len(current_grade_details["series"]) > 0
+        and current_series == current_grade_details["series"][-1]
     )
-    base_context = {
-        "by_grades": {grades.index(grade): _grade_details(grade) for grade in grades}
+    tasks = current_grade_details["tasks"].get(current_series, [])
+    batch: types.StickerBatch = {
+        "series": current_series,
+        "is_last_series": is_last_series,
+        "tasks": tasks,
+        "applications": current_grade_details["applications"],
+        "contexts": [],
+        "submissions": [],
+        "totals": [],
+        "ranks": [],
+        "grade_summaries": base_context["by_grades"].summaries,
     }
-    eligibility: List[Tuple[models.GradeApplication, Set[int]]] = []
-    current_grade_details = base_context["by_grades"][0]
 
-    for application in applications:
+    for application in current_grade_details["applications"]:
+        participant_details = current_grade_details["by_participant"][
+            application.participant
+        ]
+        submissions = participant_details["submissions"]
         context: types.StickerContext = {
             "participant": application.participant,
             "current": {
-                "participant": current_grade_details["by_participant"][
-                    application.participant
-                ],
+                "participant": participant_details,
                 "grade": current_grade_details,
                 "series": current_series,
-                "is_last_series": len(current_grade_details["series"]) > 0
-                and current_series == current_grade_details["series"][-1],
+                "is_last_series": is_last_series,
             },
             **base_context,
         }
 
-        eligibility.append((application, resolve_stickers(context)))
+        batch["contexts"].append(context)
+        batch["submissions"].append([submissions["by_tasks"][t] for t in tasks])
+        batch["totals"].append(
+            sum((sub.score or Decimal("0") for sub in submissions["all"]), Decimal("0"))
+        )
+        batch["ranks"].append(participant_details["series"][current_series]["rank"])
+
+    return batch
+
+
+def resolve_batch(batch: types.StickerBatch):
+    """Get sets of stickers for every application of the batch."""
+    entitled_to: List[Set[int]] = [set() for _ in batch["applications"]]
+
+    for sticker_nr, batch_resolver in registry.get_all_batch():
+        for stickers, is_entitled in zip(entitled_to, batch_resolver(batch)):
+            if is_entitled:
+                stickers.add(sticker_nr)
 
+    return entitled_to
+
+
+def get_eligibility(current_series: models.GradeSeries):
+    """Find out sticker eligibility for every participant in the series."""
+    batch = get_batch(current_series)
+    eligibility: List[Tuple[models.GradeApplication, Set[int]]] = list(
+        zip(batch["applications"], resolve_batch(batch))
+    )
     return eligibility
+
+
+def get_event_stickers(series: models.GradeSeries):
+    """Resolve stickers to be collected from events.
+
+    These are assigned to everyone who attended (not to substitutes).
+    """
+    prev_series = (
+        models.GradeSeries.objects.filter(
+            grade=series.grade, submission_deadline__lte=series.submission_deadline
+        )
+        .exclude(pk=series.pk)
+        .order_by("-submission_deadline", "-pk")
+        .first()
+    )
+    related_events = models.Event.objects.filter(
+        start_date__gte=(
+            prev_series.submission_deadline if prev_series else series.grade.start_date
+        ),
+        end_date__lte=series.submission_deadline,
+    ).prefetch_related("reward_stickers")
+
+    return [(e, e.reward_stickers.all()) for e in related_events]
+
+
+def get_awards(series: models.GradeSeries) -> Set[models.StickerAwardKey]:
+    """Collect all stickers participants of the series are entitled to.
+
+    That is stickers from resolvers, from attended events and handpicked stickers of the series
+    submissions. Resolved sticker numbers missing in the database are skipped.
+    """
+    sticker_pks = dict(models.Sticker.objects.values_list("nr", "pk"))
+    awards: Set[models.StickerAwardKey] = set()
+
+    for application, sticker_nrs in get_eligibility(series):
+        for nr in sticker_nrs:
+            if nr in sticker_pks:
+                awards.add(
+                    (
+                        application.pk,
+                        sticker_pks[nr],
+                        models.StickerAward.SOURCE_RESOLVER,
+                        registry.get(nr).__name__,
+                        None,
+                    )
+                )
+
+    applications_by_user = dict(
+        models.GradeApplication.objects.filter(grade=series.grade_id).values_list(
+            "participant_id", "pk"
+        )
+    )
+
+    for event, stickers_from_event in get_event_stickers(series):
+        attendees = (
+            models.EventAttendee.objects.filter(event=event)
+            .with_rank(event.capacity)
+            .values_list("user_id", "is_substitute")
+        )
+
+        for user_id, is_substitute in attendees:
+            # Only add event stickers to real attendees, not substitutes.
+            if is_substitute or user_id not in applications_by_user:
+                continue
+
+            for sticker in stickers_from_event:
+                awards.add(
+                    (
+                        applications_by_user[user_id],
+                        sticker.pk,
+                        models.StickerAward.SOURCE_EVENT,
+                        "",
+                        event.pk,
+                    )
+                )
+
+    handpicked = models.TaskSolutionSubmission.stickers.through.objects.filter(
+        tasksolutionsubmission__task__series=series
+    ).values_list("tasksolutionsubmission__application_id", "sticker_id")
+
+    for application_pk, sticker_pk in handpicked:
+        awards.add(
+            (
+                application_pk,
+                sticker_pk,
+                models.StickerAward.SOURCE_HANDPICKED,
+                "",
+                None,
+            )
+        )
+
+    return awards
+
+
+def evaluate_series(series: models.GradeSeries):
+    """Evaluate stickers of the series and store them in the ledger.
+
+    :return: Primary keys of applications whose stickers have changed.
+    """
+    return models.StickerAward.objects.sync(series, get_awards(series))
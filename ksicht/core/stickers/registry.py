@@ -1,13 +1,42 @@
+from functools import wraps
+
+
 STICKERS = {}
+BATCH_STICKERS = {}
 
 
 def register(sticker_nr, validator_fn):
     STICKERS[sticker_nr] = validator_fn
 
 
+def register_batch(sticker_nr, batch_validator_fn):
+    BATCH_STICKERS[sticker_nr] = batch_validator_fn
+
+
 def get(sticker_nr):
     return STICKERS[sticker_nr]
 
 
 def get_all():
     return STICKERS.items()
+
+
+def per_context(validator_fn):
+    """Adapt resolver taking a single context to the batch protocol."""
+
+    @wraps(validator_fn)
+    def batch_validator(batch):
+        return [bool(validator_fn(context)) for context in batch["contexts"]]
+
+    return batch_validator
+
+
+def get_batch(sticker_nr):
+    """Get batch resolver of the sticker, falling back to its adapted per-context resolver."""
+    if sticker_nr in BATCH_STICKERS:
+        return BATCH_STICKERS[sticker_nr]
+    return per_context(STICKERS[sticker_nr])
+
+
+def get_all_batch():
+    return [(sticker_nr, get_batch(sticker_nr)) for sticker_nr in STICKERS]
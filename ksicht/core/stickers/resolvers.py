@@ -1,10 +1,11 @@
 from datetime import timedelta
 from decimal import Decimal
+from itertools import islice
 import math
 import random
 
 from . import registry
-from .types import GradeDetails, StickerContext
+from .types import GradeDetails, StickerBatch, StickerContext
 
 
 def sticker(sticker_nr):
@@ -15,12 +16,44 @@ def sticker(sticker_nr):
     return decorator
 
 
+def shared_value(context: StickerContext, key, compute):
+    """Compute value once per evaluation and share it among contexts of all participants."""
+    shared = context.get("shared")
+
+    if shared is None:
+        return compute()
+
+    if key not in shared:
+        shared[key] = compute()
+
+    return shared[key]
+
+
+def batch(sticker_nr):
+    """Register faster alternative of the resolver evaluating all participants at once.
+
+    Batch resolver gets `StickerBatch` and returns list of booleans, one per application.
+    It has to give the same results as the per-context resolver of the same sticker.
+    """
+
+    def decorator(batch_resolver_fn):
+        registry.register_batch(sticker_nr, batch_resolver_fn)
+        return batch_resolver_fn
+
+    return decorator
+
+
 @sticker(1)
 def solver(context: StickerContext):
     """Given to anyone who participates."""
     return True
 
 
+@batch(1)
+def solver_batch(batch: StickerBatch):
+    return [True] * len(batch["applications"])
+
+
 @sticker(2)
 def solved_all_tasks_in_series(context: StickerContext):
     """Given to anyone who has submitted solutions for all tasks of current series."""
@@ -32,6 +65,14 @@ def solved_all_tasks_in_series(context: StickerContext):
     ) == len(tasks)
 
 
+@batch(2)
+def solved_all_tasks_in_series_batch(batch: StickerBatch):
+    return [
+        len(row) > 0 and all(sub is not None for sub in row)
+        for row in batch["submissions"]
+    ]
+
+
 @sticker(3)
 def solution_in_every_series(context: StickerContext):
     """Given to anyone who has submitted a solution in every series."""
@@ -63,6 +104,15 @@ def zero_points(context: StickerContext):
     )
 
 
+@batch(8)
+def zero_points_batch(batch: StickerBatch):
+    zero = Decimal("0")
+    return [
+        any(sub is not None and sub.score == zero for sub in row)
+        for row in batch["submissions"]
+    ]
+
+
 @sticker(9)
 def reached_100(context: StickerContext):
     """Given to anyone who has reached a sum of at least 100 points."""
@@ -72,6 +122,11 @@ def reached_100(context: StickerContext):
     ) >= Decimal("100")
 
 
+@batch(9)
+def reached_100_batch(batch: StickerBatch):
+    return [total >= Decimal("100") for total in batch["totals"]]
+
+
 @sticker(10)
 def reached_150(context: StickerContext):
     """Given to anyone who has reached a sum of at least 150 points."""
@@ -81,6 +136,11 @@ def reached_150(context: StickerContext):
     ) >= Decimal("150")
 
 
+@batch(10)
+def reached_150_batch(batch: StickerBatch):
+    return [total >= Decimal("150") for total in batch["totals"]]
+
+
 @sticker(12)
 def full_score(context: StickerContext):
     """Given to anyone who has been given the maximum number of points for at least one of their submissions within a series."""
@@ -99,18 +159,33 @@ def full_score(context: StickerContext):
     )
 
 
+@batch(12)
+def full_score_batch(batch: StickerBatch):
+    points = [t.points for t in batch["tasks"]]
+    return [
+        any(
+            sub is not None and sub.score == task_points
+            for sub, task_points in zip(row, points)
+        )
+        for row in batch["submissions"]
+    ]
+
+
 @sticker(13)
 def random_2_percent(context: StickerContext):
     """Randomly (yet with predictable seed according to current_series) given to approx 2% of the applications."""
-    applications_count = len(context["current"]["grade"]["by_participant"])
-    pick_count = math.ceil(applications_count * 0.02)
+    current_series = context["current"]["series"]
 
-    # Initialize seed for the randomness to be consistent with current_series
-    random.seed(int(context["current"]["series"].pk))
+    def _draw():
+        participants = context["current"]["grade"]["by_participant"]
+        pick_count = math.ceil(len(participants) * 0.02)
+        # Private generator seeded with current_series keeps the draw consistent
+        # without touching the global random state.
+        rnd = random.Random(int(current_series.pk))
+        return set(rnd.choices([p.pk for p in participants], k=pick_count))
 
-    return context["participant"].pk in random.choices(
-        [a.pk for a in context["current"]["grade"]["by_participant"]], k=pick_count
-    )
+    winners = shared_value(context, ("random_2_percent", current_series.pk), _draw)
+    return context["participant"].pk in winners
 
 
 @sticker(14)
@@ -132,6 +207,20 @@ def late_submission(context: StickerContext):
     )
 
 
+@batch(14)
+def late_submission_batch(batch: StickerBatch):
+    deadline = batch["series"].submission_deadline
+    return [
+        any(
+            sub is not None
+            and bool(sub.file)
+            and (deadline - sub.submitted_at) <= timedelta(hours=4)
+            for sub in row
+        )
+        for row in batch["submissions"]
+    ]
+
+
 @sticker(15)
 def early_submission(context: StickerContext):
     """Given to anyone who has submitted a solution in series more than 2 weeks before submission deadline."""
@@ -151,6 +240,19 @@ def early_submission(context: StickerContext):
     )
 
 
+@batch(15)
+def early_submission_batch(batch: StickerBatch):
+    deadline = batch["series"].submission_deadline
+
+    def _is_eligible(row):
+        submissions = [sub for sub in row if sub is not None]
+        return len(submissions) > 0 and all(
+            (deadline - sub.submitted_at) >= timedelta(days=14) for sub in submissions
+        )
+
+    return [_is_eligible(row) for row in batch["submissions"]]
+
+
 @sticker(18)
 def ranked_no_worse_than_7th(context: StickerContext):
     """Given to anyone who has ranked no worse than 7th in all of the series of grades."""
@@ -191,6 +293,14 @@ def submitted_solution_in_last_series(context: StickerContext):
     )
 
 
+@batch(29)
+def submitted_solution_in_last_series_batch(batch: StickerBatch):
+    return [
+        batch["is_last_series"] and any(sub is not None for sub in row)
+        for row in batch["submissions"]
+    ]
+
+
 def submitted_solution_in_each_task_of_last_n_grades(context: StickerContext, n: int):
     participant = context["participant"]
 
@@ -206,33 +316,67 @@ def submitted_solution_in_each_task_of_last_n_grades(context: StickerContext, n:
 
         return tasks_count == submission_count
 
-    last_n_grades = list(context["by_grades"].values())[:n]
+    if not context["current"]["is_last_series"]:
+        return False
 
-    return (
-        context["current"]["is_last_series"]
-        and len(last_n_grades) == n
-        and all(_is_eligible(grade) for grade in last_n_grades)
+    last_n_grades = list(islice(context["by_grades"].values(), n))
+
+    return len(last_n_grades) == n and all(
+        _is_eligible(grade) for grade in last_n_grades
     )
 
 
+def submitted_solution_in_each_task_of_last_n_grades_batch(batch: StickerBatch, n: int):
+    summaries = batch["grade_summaries"]
+
+    if not batch["is_last_series"] or len(summaries) < n:
+        return [False] * len(batch["applications"])
+
+    last_n_grades = [summaries[i] for i in range(n)]
+
+    return [
+        all(
+            grade["submission_counts"].get(application.participant_id, 0)
+            == grade["task_count"]
+            for grade in last_n_grades
+        )
+        for application in batch["applications"]
+    ]
+
+
 @sticker(35)
 def submitted_solution_in_each_task_of_last_two_grades(context: StickerContext):
     """Given to anyone who has submitted a solution in each task of last two grades."""
     return submitted_solution_in_each_task_of_last_n_grades(context, 2)
 
 
+@batch(35)
+def submitted_solution_in_each_task_of_last_two_grades_batch(batch: StickerBatch):
+    return submitted_solution_in_each_task_of_last_n_grades_batch(batch, 2)
+
+
 @sticker(36)
 def submitted_solution_in_each_task_of_last_three_grades(context: StickerContext):
     """Given to anyone who has submitted a solution in each task of last three grades."""
     return submitted_solution_in_each_task_of_last_n_grades(context, 3)
 
 
+@batch(36)
+def submitted_solution_in_each_task_of_last_three_grades_batch(batch: StickerBatch):
+    return submitted_solution_in_each_task_of_last_n_grades_batch(batch, 3)
+
+
 @sticker(37)
 def submitted_solution_in_each_task_of_last_four_grades(context: StickerContext):
     """Given to anyone who has submitted a solution in each task of last four grades."""
     return submitted_solution_in_each_task_of_last_n_grades(context, 4)
 
 
+@batch(37)
+def submitted_solution_in_each_task_of_last_four_grades_batch(batch: StickerBatch):
+    return submitted_solution_in_each_task_of_last_n_grades_batch(batch, 4)
+
+
 @sticker(38)
 def fellowship_of_benzenes(context: StickerContext):
     """Given to anyone who has ranked no worse than 6th in the last series."""
@@ -244,6 +388,11 @@ def fellowship_of_benzenes(context: StickerContext):
     )
 
 
+@batch(38)
+def fellowship_of_benzenes_batch(batch: StickerBatch):
+    return [rank <= 6 for rank in batch["ranks"]]
+
+
 @sticker(42)
 def ranked_42nd(context: StickerContext):
     """Given to anyone who has ranked 42nd in the current series."""
@@ -253,3 +402,8 @@ def ranked_42nd(context: StickerContext):
         ]
         == 42
     )
+
+
+@batch(42)
+def ranked_42nd_batch(batch: StickerBatch):
+    return [rank == 42 for rank in batch["ranks"]]
@@ -1,14 +1,32 @@
-from typing import Dict, List
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, Dict, List, Mapping, NamedTuple, Optional, Sequence
+from uuid import UUID
 
 from typing_extensions import TypedDict
 
 from .. import models
 
 
+class SubmissionRow(NamedTuple):
+    """Lightweight read-only stand-in for `TaskSolutionSubmission` used by resolvers."""
+
+    id: int
+    application_id: int
+    task_id: UUID
+    file: str
+    score: Optional[Decimal]
+    submitted_at: datetime
+
+    @property
+    def pk(self):
+        return self.id
+
+
 class Submissions(TypedDict):
-    all: List[models.TaskSolutionSubmission]
-    by_series: Dict[models.GradeSeries, List[models.TaskSolutionSubmission]]
-    by_tasks: Dict[models.Task, List[models.TaskSolutionSubmission]]
+    all: List[SubmissionRow]
+    by_series: Dict[models.GradeSeries, List[SubmissionRow]]
+    by_tasks: Dict[models.Task, Optional[SubmissionRow]]
 
 
 class SeriesDetails(TypedDict):
@@ -23,11 +41,28 @@ class GradeParticipantDetails(TypedDict):
 
 
 class GradeDetails(TypedDict):
+    applications: List[models.GradeApplication]
     series: List[models.GradeSeries]
     tasks: Dict[models.GradeSeries, List[models.Task]]
     by_participant: Dict[models.Participant, GradeParticipantDetails]
 
 
+class GradeSummary(TypedDict):
+    """Just the numbers of tasks and submissions of a grade, much cheaper than `GradeDetails`."""
+
+    task_count: int
+    # Number of submissions by participant primary key.
+    submission_counts: Dict[int, int]
+
+
+class GradeData(TypedDict):
+    series: List[models.GradeSeries]
+    tasks: List[models.Task]
+    max_scores: Dict[str, Optional[int]]
+    application_rows: List[tuple]
+    submission_rows: List[SubmissionRow]
+
+
 class CurrentGradeExtras(TypedDict):
     grade: GradeDetails
     series: models.GradeSeries
@@ -38,4 +73,25 @@ class CurrentGradeExtras(TypedDict):
 class StickerContext(TypedDict):
     participant: models.Participant
     current: CurrentGradeExtras
-    by_grades: Dict[int, GradeDetails]
+    by_grades: Mapping[int, GradeDetails]
+    # State shared by all contexts of a single evaluation, see `resolvers.shared_value`.
+    shared: Dict[Any, Any]
+
+
+class StickerBatch(TypedDict):
+    """All participants of the current series at once, each column has a row per application."""
+
+    series: models.GradeSeries
+    is_last_series: bool
+    # Tasks of the current series, columns of `submissions`.
+    tasks: List[models.Task]
+    applications: List[models.GradeApplication]
+    contexts: List[StickerContext]
+    # Submission of every task of the current series, `None` if not submitted.
+    submissions: List[List[Optional[SubmissionRow]]]
+    # Total score of all the grade submissions.
+    totals: List[Decimal]
+    # Rank in the current series.
+    ranks: List[int]
+    # Summaries of the current grade and the previous ones (0 = current grade).
+    grade_summaries: Sequence[GradeSummary]
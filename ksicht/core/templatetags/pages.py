@@ -1,23 +1,51 @@
+from typing import FrozenSet, List, NamedTuple
+
 from django import template
 from django.contrib.flatpages.models import FlatPage
 from django.core.cache import cache
 
+from .. import caching
+from ..models import FlatPageMeta
+
 
 register = template.Library()
 
 
+class MenuPage(NamedTuple):
+    url: str
+    title: str
+    allowed_group_ids: FrozenSet[int]
+
+
+def get_menu_pages(prefix: str) -> List[MenuPage]:
+    """Load all the pages under the prefix in a compact form that is cheap to cache."""
+    pages = {}
+
+    for url, title, group_id in FlatPage.objects.filter(
+        url__startswith=prefix
+    ).values_list("url", "title", "metadata__allowed_groups"):
+        pages.setdefault((url, title), set())
+
+        if group_id is not None:
+            pages[url, title].add(group_id)
+
+    return [
+        MenuPage(url, title, frozenset(group_ids))
+        for (url, title), group_ids in pages.items()
+    ]
+
+
 @register.simple_tag(takes_context=True)
 def pages_by_prefix(context, prefix):
-    matching_pages = cache.get(f"pages_by_prefix::{prefix}")
+    cache_key = caching.make_key(f"pages_by_prefix::{prefix}", caching.FLATPAGE)
+    matching_pages = cache.get(cache_key)
 
-    if not matching_pages:
-        matching_pages = FlatPage.objects.filter(
-            url__startswith=prefix
-        ).prefetch_related("metadata__allowed_groups")
-        cache.set(f"pages_by_prefix::{prefix}", matching_pages, 120)
+    if matching_pages is None:
+        matching_pages = get_menu_pages(prefix)
+        cache.set(cache_key, matching_pages, 60 * 60 * 24)
 
     return [
         p
         for p in matching_pages
-        if not hasattr(p, "metadata") or p.metadata.is_accessible_for(context["user"])
+        if FlatPageMeta.is_accessible(p.allowed_group_ids, context["user"])
     ]
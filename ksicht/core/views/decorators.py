@@ -1,25 +1,34 @@
 from functools import wraps
 
 from django.contrib.auth import REDIRECT_FIELD_NAME
-from django.contrib.auth.decorators import user_passes_test
+from django.contrib.auth.views import redirect_to_login
 from django.shortcuts import redirect
-from django.urls import reverse_lazy
+from django.urls import reverse
 
-from ..models import Grade, Participant
+from .helpers import get_current_grade
 
 
 def is_participant(
     function=None, redirect_field_name=REDIRECT_FIELD_NAME, login_url=None
 ):
     """Decorator for views that checks that the user is a particpant, e.g. has a participant profile."""
-    actual_decorator = user_passes_test(
-        lambda u: Participant.objects.filter(user=u).exists(),
-        login_url=reverse_lazy("core:current_grade"),
-        redirect_field_name=redirect_field_name,
-    )
+
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrap(request, *args, **kwargs):
+            if request.participation.is_participant:
+                return view_func(request, *args, **kwargs)
+            return redirect_to_login(
+                request.get_full_path(),
+                login_url or reverse("core:current_grade"),
+                redirect_field_name,
+            )
+
+        return wrap
+
     if function:
-        return actual_decorator(function)
-    return actual_decorator
+        return decorator(function)
+    return decorator
 
 
 def current_grade_exists(function):
@@ -27,7 +36,8 @@ def current_grade_exists(function):
 
     @wraps(function)
     def wrap(request, *args, **kwargs):
-        grade_exists = Grade.objects.get_current() is not None
+        current_grade, _ = get_current_grade(request)
+        grade_exists = current_grade is not None
 
         if grade_exists:
             return function(request, *args, **kwargs)
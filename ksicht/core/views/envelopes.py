@@ -1,13 +1,12 @@
 from urllib.parse import quote
 
 from django.conf import settings
-from django.http import HttpResponse
+from django.http import FileResponse, HttpResponse
 from django.views.generic import View
 from django.views.generic.detail import BaseDetailView
 
 from ksicht import pdf
-from .. import models
-from ..constants import SCHOOLS
+from .. import envelopes, models
 
 
 __all__ = (
@@ -20,44 +19,42 @@ __all__ = (
 
 class SeriesTaskEnvelopesPrintout(View):
     def get(self, request, *args, **kwargs):
-        response = HttpResponse(content_type="application/pdf")
-        filename = quote("Obálky pro školy")
-        response["Content-Disposition"] = f"attachment; filename*=UTF-8''{filename}.pdf"
-
-        def _build_lines(s):
-            # If street exists
-            if s[9]:
-                return {
-                    "lines": (
-                        "K rukám učitelů chemie",
-                        s[6],
-                        s[8],
-                        f"{s[13]} {s[14]}",
-                    ),
-                    "note": None,
-                }
-            return {
-                "lines": ("K rukám učitelů chemie", s[6], s[14], s[13]),
-                "note": None,
-            }
+        filename = "Obálky pro školy.pdf"
 
-        lines = [_build_lines(s) for s in SCHOOLS]
+        # Envelopes only change with the schools dataset, they're built in background.
+        if artifact := models.ExportArtifact.objects.get_fresh(
+            envelopes.SCHOOL_ENVELOPES_KEY, envelopes.school_envelopes_fingerprint()
+        ):
+            return FileResponse(
+                artifact.file.open("rb"),
+                as_attachment=True,
+                filename=filename,
+                content_type="application/pdf",
+            )
 
-        pdf.envelopes(lines, settings.KSICHT_CONTACT_ADDRESS_LINES, response)
+        envelopes.schedule_school_envelopes()
+
+        response = HttpResponse(content_type="application/pdf")
+        response["Content-Disposition"] = (
+            f"attachment; filename*=UTF-8''{quote(filename)}"
+        )
+        envelopes.build_school_envelopes(response)
 
         return response
 
 
 class ParticipantEnvelopesPrintout:
     def render_to_response(self, context):
-        participants = self.get_participants(context).order_by(
-            "user__last_name", "user__first_name", "user__email"
-        ).distinct()
+        participants = (
+            self.get_participants(context)
+            .order_by("user__last_name", "user__first_name", "user__email")
+            .distinct()
+        )
         title = self.get_title(context)
         response = HttpResponse(content_type="application/pdf")
-        response[
-            "Content-Disposition"
-        ] = f"attachment; filename*=UTF-8''{quote(title)}.pdf"
+        response["Content-Disposition"] = (
+            f"attachment; filename*=UTF-8''{quote(title)}.pdf"
+        )
 
         lines = [
             {
@@ -1,16 +1,15 @@
 from collections import defaultdict
-import csv
-from urllib.parse import quote
 
 from django.contrib.auth.decorators import login_required
 from django.db import transaction
-from django.http import Http404, HttpResponse
+from django.http import Http404
 from django.utils import formats
 from django.utils.decorators import method_decorator
 from django.views.generic import DetailView, ListView
 from django.views.generic.detail import BaseDetailView
 
 from .. import models
+from .helpers import EXPORT_CHUNK_SIZE, streaming_csv_response
 
 
 def is_enlisted(user, event):
@@ -130,20 +129,14 @@ class EventAttendeesExportView(BaseDetailView):
 
     def render_to_response(self, context):
         event = context["object"]
-        attendees = models.EventAttendee.objects.filter(event=event).select_related(
-            "user"
+        attendees = (
+            models.EventAttendee.objects.filter(event=event)
+            .select_related("user__participant_profile")
+            .with_rank(event.capacity)
         )
-        participants = models.Participant.objects.filter(
-            user__eventattendee__in=attendees
-        )
-
-        response = HttpResponse(content_type="text/csv")
-        filename = quote(f"{event} - účastníci.csv")
-        response["Content-Disposition"] = f"attachment; filename*=utf-8''{filename}"
 
-        writer = csv.writer(response, quotechar='"')
-        writer.writerow(
-            [
+        def _rows():
+            yield [
                 "Pořadí",
                 "Datum přihlášky",
                 "Email",
@@ -155,36 +148,35 @@ class EventAttendeesExportView(BaseDetailView):
                 "(Škola)",
                 "(Město)",
             ]
-        )
-
-        for idx, attendee in enumerate(attendees):
-            rank = idx + 1
-            is_substitute = rank > event.capacity
-            participant = next(
-                (p for p in participants if p.user_id == attendee.user.pk), None
-            )
-            birth_date = (
-                participant.birth_date if participant else None
-            ) or attendee.user_birth_date
-            row = [
-                f"{rank}.",
-                formats.date_format(attendee.signup_date, "SHORT_DATE_FORMAT"),
-                attendee.user.email,
-                attendee.user.first_name,
-                attendee.user.last_name,
-                "Náhradník" if is_substitute else "Účastník",
-                (participant.phone if participant else None) or attendee.user_phone,
-                formats.date_format(birth_date, "SHORT_DATE_FORMAT")
-                if birth_date
-                else None,
-            ]
-
-            if participant:
-                row += [participant.school_name, participant.city]
-
-            writer.writerow(row)
 
-            if rank == event.capacity:
-                writer.writerow([])
-
-        return response
+            for attendee in attendees.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+                participant = getattr(attendee.user, "participant_profile", None)
+                birth_date = (
+                    participant.birth_date if participant else None
+                ) or attendee.user_birth_date
+                row = [
+                    f"{attendee.rank}.",
+                    formats.date_format(attendee.signup_date, "SHORT_DATE_FORMAT"),
+                    attendee.user.email,
+                    attendee.user.first_name,
+                    attendee.user.last_name,
+                    "Náhradník" if attendee.is_substitute else "Účastník",
+                    (participant.phone if participant else None) or attendee.user_phone,
+                    (
+                        formats.date_format(birth_date, "SHORT_DATE_FORMAT")
+                        if birth_date
+                        else None
+                    ),
+                ]
+
+                if participant:
+                    row += [participant.school_name, participant.city]
+
+                yield row
+
+                if attendee.rank == event.capacity:
+                    yield []
+
+        return streaming_csv_response(
+            _rows(), f"{event} - účastníci.csv", quotechar='"'
+        )
@@ -1,18 +1,14 @@
-import csv
-from decimal import Decimal
-from urllib.parse import quote
-
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
-from django.http import HttpResponse
 from django.shortcuts import redirect
 from django.utils.decorators import method_decorator
 from django.views.generic.detail import BaseDetailView, DetailView
 from django.views.generic.edit import BaseFormView
-import pydash as py_
 
 from .. import forms, models
+from ..rankings import listing_from_ranked
 from .decorators import current_grade_exists, is_participant
+from .helpers import EXPORT_CHUNK_SIZE, get_current_grade, streaming_csv_response
 
 
 __all__ = (
@@ -27,17 +23,13 @@ class CurrentGradeView(DetailView):
     template_name = "core/current_grade.html"
 
     def get_object(self, queryset=None):
-        return models.Grade.objects.get_current()
+        current_grade, _ = get_current_grade(self.request)
+        return current_grade
 
     def get_context_data(self, **kwargs):
         data = super().get_context_data(**kwargs)
-        data["is_participant"] = (
-            self.request.user.is_authenticated and self.request.user.is_participant()
-        )
-        data["is_grade_participant"] = (
-            self.request.user.is_authenticated
-            and self.object.participants.filter(user=self.request.user).exists()
-        )
+        data["is_participant"] = self.request.participation.is_participant
+        data["is_grade_participant"] = self.request.participation.is_grade_participant
         data["can_apply"] = data["is_participant"] and not data["is_grade_participant"]
         data["application_form"] = forms.CurrentGradeAppliationForm()
         return data
@@ -58,13 +50,14 @@ class CurrentGradeApplicationView(BaseFormView):
         if not user.is_authenticated:
             return self.form_invalid()
 
-        grade = models.Grade.objects.get_current()
+        grade, _ = get_current_grade(self.request)
 
         if not grade:
             return self.form_invalid()
 
+        participation = self.request.participation
         can_apply = (
-            user.is_participant and not grade.participants.filter(user=user).exists()
+            participation.is_participant and not participation.is_grade_participant
         )
 
         if can_apply:
@@ -93,81 +86,33 @@ class GradeResultsExportView(BaseDetailView):
     def render_to_response(self, context):
         grade = context["object"]
 
-        all_tasks = models.Task.objects.filter(series__grade=grade)
-        all_submissions = models.TaskSolutionSubmission.objects.filter(
-            task__in=all_tasks
+        all_tasks = list(models.Task.objects.filter(series__grade=grade))
+        ranked_applications = (
+            models.GradeApplication.objects.filter(grade=grade)
+            .select_related("participant__user")
+            .ranked(all_tasks)
         )
-        all_applications = models.GradeApplication.objects.filter(
-            grade=grade
-        ).prefetch_related("participant__user")
-
-        response = HttpResponse(content_type="text/csv")
-        filename = quote(f"{grade} - výsledky.csv")
-        response["Content-Disposition"] = f"attachment; filename*=utf-8''{filename}"
 
         task_headers = [f"Body {t.series} - {t}" for t in all_tasks]
 
-        writer = csv.writer(response)
-        writer.writerow(
-            [
+        def _rows():
+            yield [
                 "Pořadí",
                 "Jméno",
                 "Příjmení",
                 "Ročník",
                 "Škola",
-            ]
-            + task_headers
-            + ["Body celkem"]
-        )
-
-        # This closely mirrors GradeSeries.get_rankings.
-        # But it includes all tasks in all series.
-
-        def _find_application(app_id):
-            return py_.find(all_applications, lambda a: a.pk == app_id)
-
-        def _find_task(task_id):
-            return py_.find(all_tasks, lambda t: t.pk == task_id)
+            ] + task_headers + ["Body celkem"]
 
-        scoring_dict = {
-            a: {"by_tasks": {t: None for t in all_tasks}, "total": Decimal("0")}
-            for a in all_applications
-        }
-
-        for s in all_submissions:
-            a = _find_application(s.application_id)
-            t = _find_task(s.task_id)
-
-            if t:
-                scoring_dict[a]["by_tasks"][t] = s.score
-
-            scoring_dict[a]["total"] += s.score or Decimal("0")
-
-        scoring = [
-            (application, scores["by_tasks"], scores["total"])
-            for (application, scores) in scoring_dict.items()
-        ]
-
-        # Attach ranks
-        sorted_scoring = [
-            # (application, rank, task scores, total score)
-            (row[0], index + 1, row[1], row[2])
-            for (index, row) in enumerate(
-                sorted(scoring, key=lambda r: r[2], reverse=True)
-            )
-        ]
-
-        for application, rank, task_scores, total_score in sorted_scoring:
-            writer.writerow(
-                [
+            for application, rank, task_scores, total_score in listing_from_ranked(
+                ranked_applications.iterator(chunk_size=EXPORT_CHUNK_SIZE), all_tasks
+            ):
+                yield [
                     f"{rank}.",
                     application.participant.user.first_name,
                     application.participant.user.last_name,
                     f"{application.participant_current_grade}.",
                     application.participant.school,
-                ]
-                + [task_scores[t] or "-" for t in all_tasks]
-                + [total_score]
-            )
+                ] + [task_scores[t] or "-" for t in all_tasks] + [total_score]
 
-        return response
+        return streaming_csv_response(_rows(), f"{grade} - výsledky.csv")
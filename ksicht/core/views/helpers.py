@@ -1,26 +1,56 @@
+import csv
+from urllib.parse import quote
+
+from django.http import StreamingHttpResponse
+
 from ..models import Grade
 
 
-def get_current_grade_context(user):
+# Number of rows fetched from DB at once by exports streaming their output.
+EXPORT_CHUNK_SIZE = 500
+
+
+def get_current_grade(request):
+    """Return current grade and series, resolved only once per request."""
+    if not hasattr(request, "_current_grade"):
+        request._current_grade = Grade.objects.get_current_with_series()
+    return request._current_grade
+
+
+def get_current_grade_context(request):
     context = {}
-    context["current_grade"] = current_grade = Grade.objects.get_current()
-    context["current_series"] = (
-        current_grade.get_current_series() if current_grade else None
-    )
-    context["is_current_grade_participant"] = (
-        current_grade.participants.filter(user=user).exists()
-        if current_grade and user.is_authenticated
-        else False
-    )
+    current_grade, context["current_series"] = get_current_grade(request)
+    context["current_grade"] = current_grade
+    context["is_current_grade_participant"] = request.participation.is_grade_participant
     return context
 
 
 class CurrentGradeMixin:
     def dispatch(self, *args, **kwargs):
-        self.grade_context = get_current_grade_context(self.request.user)
+        self.grade_context = get_current_grade_context(self.request)
         return super().dispatch(*args, **kwargs)
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context.update(self.grade_context)
         return context
+
+
+class Echo:
+    """Pseudo-buffer which returns written value instead of storing it.
+
+    Lets `csv.writer` produce rows one by one for a streaming response.
+    """
+
+    def write(self, value):
+        return value
+
+
+def streaming_csv_response(rows, filename, **writer_kwargs):
+    """Stream rows as CSV attachment, rows are produced lazily as the response is sent."""
+    writer = csv.writer(Echo(), **writer_kwargs)
+    response = StreamingHttpResponse(
+        (writer.writerow(row) for row in rows), content_type="text/csv"
+    )
+    response["Content-Disposition"] = f"attachment; filename*=utf-8''{quote(filename)}"
+    return response
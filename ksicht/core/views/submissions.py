@@ -1,13 +1,13 @@
 from collections import OrderedDict
 from functools import reduce
 from operator import or_
-from urllib.parse import quote
+import tempfile
 
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required, permission_required
 from django.db import models, transaction
 from django.forms import formset_factory, modelformset_factory
-from django.http.response import HttpResponse, HttpResponseNotFound
+from django.http.response import FileResponse, HttpResponseNotFound
 from django.shortcuts import get_object_or_404, redirect
 from django.urls import reverse, reverse_lazy
 from django.utils.decorators import method_decorator
@@ -15,18 +15,20 @@ from django.views import View
 from django.views.generic import FormView, TemplateView
 from django.views.generic.edit import DeleteView
 
-from ksicht import pdf
 from .. import forms
 from ..models import (
+    ExportArtifact,
     Grade,
     GradeApplication,
     GradeSeries,
     Participant,
     Sticker,
+    StickerAward,
     Task,
     TaskSolutionSubmission,
 )
 from .decorators import current_grade_exists, is_participant
+from .helpers import get_current_grade
 
 
 __all__ = (
@@ -38,6 +40,10 @@ __all__ = (
 )
 
 
+# Exports larger than this are spooled to a temporary file on disk.
+EXPORT_SPOOL_MAX_SIZE = 10 * 1024 * 1024
+
+
 @method_decorator(
     [current_grade_exists, login_required, is_participant], name="dispatch"
 )
@@ -45,22 +51,17 @@ class SolutionSubmitView(TemplateView):
     template_name = "core/solution_submit.html"
 
     def dispatch(self, request, *args, **kwargs):
-        self.current_grade = Grade.objects.get_current()
+        self.current_grade, self.current_series = get_current_grade(request)
 
         if not self.current_grade:
             return HttpResponseNotFound()
 
-        self.current_series = self.current_grade.get_current_series()
-
         if not self.current_series:
             return HttpResponseNotFound()
 
-        self.application = GradeApplication.objects.filter(
-            participant=self.request.user.participant_profile,
-            grade=self.current_grade,
-        ).first()
+        self.application_id = request.participation.application_id
 
-        if not self.application:
+        if not self.application_id:
             return HttpResponseNotFound()
 
         self.series_tasks = self.current_series.tasks.all()
@@ -82,7 +83,7 @@ class SolutionSubmitView(TemplateView):
         task_submissions = {
             submission.task_id: submission
             for submission in TaskSolutionSubmission.objects.filter(
-                application=self.application, task__in=self.series_tasks
+                application_id=self.application_id, task__in=self.series_tasks
             )
         }
         form_task_id = self.request.GET.get("task_id")
@@ -94,15 +95,19 @@ class SolutionSubmitView(TemplateView):
             formset.append(
                 (
                     task,
-                    forms.SolutionSubmitForm(
-                        files=self.request.FILES
-                        if self.request.method == "POST"
-                        and str(task.id) == form_task_id
-                        else None,
-                        task=task,
-                    )
-                    if task.id not in task_submissions
-                    else None,
+                    (
+                        forms.SolutionSubmitForm(
+                            files=(
+                                self.request.FILES
+                                if self.request.method == "POST"
+                                and str(task.id) == form_task_id
+                                else None
+                            ),
+                            task=task,
+                        )
+                        if task.id not in task_submissions
+                        else None
+                    ),
                     submission,
                     submission.can_delete(self.request.user) if submission else False,
                 )
@@ -129,7 +134,7 @@ class SolutionSubmitView(TemplateView):
             raise ValueError("Could not locate submitted file")
 
         submission, created = TaskSolutionSubmission.objects.get_or_create(
-            application=self.application,
+            application_id=self.application_id,
             task=task,
             defaults={"file": file_descriptor},
         )
@@ -142,8 +147,7 @@ class SolutionSubmitView(TemplateView):
             )
             return
 
-        submission.prepare_for_export()
-        submission.save()
+        submission.schedule_export_preparation()
 
         messages.add_message(
             self.request,
@@ -308,6 +312,11 @@ class SubmissionOverview(FormView):
         if len(filtering) > 0:
             TaskSolutionSubmission.objects.filter(reduce(or_, filtering)).delete()
 
+        # Submissions created in bulk don't send any model signals.
+        self.series.schedule_rankings_rebuild()
+        StickerAward.objects.invalidate_from(self.series)
+        self.series.schedule_export_bundles()
+
         messages.add_message(
             self.request,
             messages.SUCCESS,
@@ -375,16 +384,17 @@ class SolutionExportView(View):
         return super().dispatch(*args, **kwargs)
 
     def get(self, request, *args, **kwargs):
-        submitted_solutions = (
-            TaskSolutionSubmission.objects.filter(task=self.task)
-            .select_related("task", "application__participant__user")
-            .exclude(file="")
-            .order_by(
-                "application__participant__user__last_name",
-                "application__participant__user__first_name",
+        # Don't wait for the background jobs, prepare what is still missing right away.
+        submitted_solutions, failed = self.task.get_export_submissions()
+
+        if failed:
+            messages.add_message(
+                self.request,
+                messages.WARNING,
+                "<i class='fas fa-exclamation-circle notification-icon'></i> Některá řešení "
+                "se nepodařilo připravit pro export: "
+                + ", ".join(str(s.application.participant) for s in failed),
             )
-        )
-        submitted_solutions = [s for s in submitted_solutions if bool(s.file)]
 
         if len(submitted_solutions) == 0:
             messages.add_message(
@@ -402,18 +412,40 @@ class SolutionExportView(View):
                 )
             )
 
-        response = HttpResponse(content_type="application/pdf")
-        filename = quote(f"{self.task} - export řešení")
-        response["Content-Disposition"] = f"attachment; filename*=UTF-8''{filename}.pdf"
         is_duplex = bool(request.GET.get("duplex"))
-        solution_files = []
-
-        for s in submitted_solutions:
-            solution_files.append(
-                s.file_for_export_normal
+        filename = f"{self.task} - export řešení.pdf"
+        bundle_key = self.task.get_export_bundle_key(is_duplex)
+        fingerprint = self.task.get_export_fingerprint(submitted_solutions)
+
+        # Bundles get built by a background job once the submission deadline passes.
+        if bundle := ExportArtifact.objects.get_fresh(bundle_key, fingerprint):
+            return FileResponse(
+                bundle.file.open("rb"),
+                as_attachment=True,
+                filename=filename,
+                content_type="application/pdf",
             )
 
-        # Join all files in one large batch.
-        pdf.concatenate(solution_files, response, is_duplex)
+        # Bundle is missing or out of date (e.g. a late submission was added), have it
+        # rebuilt once the deadline passes.
+        self.task.series.schedule_export_bundles()
 
-        return response
+        # Join all files in one large batch. The result is spooled to disk once it
+        # gets large so that big exports don't have to be held in memory as a whole.
+        # FileResponse closes the file once it's sent.
+        out_file = tempfile.SpooledTemporaryFile(max_size=EXPORT_SPOOL_MAX_SIZE)
+
+        try:
+            self.task.build_export_bundle(submitted_solutions, is_duplex, out_file)
+        except Exception:
+            out_file.close()
+            raise
+
+        out_file.seek(0)
+
+        return FileResponse(
+            out_file,
+            as_attachment=True,
+            filename=filename,
+            content_type="application/pdf",
+        )
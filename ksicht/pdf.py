@@ -1,11 +1,16 @@
-import os
-from copy import deepcopy
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from functools import lru_cache
 import io
-from pathlib import Path
-from typing import List, Optional, Sequence
+from itertools import repeat
+import threading
+from typing import Iterable, List, NamedTuple, Optional, Sequence, Tuple
 
 from django.conf import settings
-from pdfrw import PdfReader, PdfWriter, PdfDict
+from django.db.models.fields.files import FieldFile
+from pdfrw import PdfReader, PdfDict
+from pdfrw.errors import PdfParseError
+from pdfrw.pdfwriter import user_fmt as pdfrw_user_fmt
 from pypdf import PdfReader as PdfFileReader, PageObject
 from pypdf import PdfWriter as PdfFileWriter
 from pypdf.errors import PdfReadError
@@ -14,6 +19,7 @@ from pypdf import PaperSize
 from reportlab.lib.pagesizes import A4, C3, landscape
 from reportlab.lib.styles import ParagraphStyle
 from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.pdfmetrics import stringWidth
 from reportlab.pdfbase.ttfonts import TTFont
 from reportlab.pdfgen import canvas
 from reportlab.platypus import Paragraph
@@ -26,8 +32,24 @@ __all__ = (
     "PdfReadError",
 )
 
-reportlab.rl_config.TTFSearchPath.append(str(settings.BASE_DIR) + "/fonts")
-pdfmetrics.registerFont(TTFont("Helvetica", "Helvetica.ttf"))
+
+# Bundled TrueType Helvetica, unlike the standard PDF font it supports Czech characters.
+# It has its own name as reportlab doesn't let a font replace an already used one.
+FONT_NAME = "Helvetica-TTF"
+
+
+@lru_cache(maxsize=None)
+def register_fonts():
+    """Register bundled fonts with reportlab, only done once the first PDF gets rendered."""
+    reportlab.rl_config.TTFSearchPath.append(str(settings.BASE_DIR) + "/fonts")
+    pdfmetrics.registerFont(TTFont(FONT_NAME, "Helvetica.ttf"))
+
+
+class PreparedSubmission(NamedTuple):
+    # Number of pages of the normal export variant.
+    page_count: int
+    # Whether the uploaded file is a readable PDF (or got replaced with an error page).
+    is_valid: bool
 
 
 class EnvelopeRecipientInfo(TypedDict):
@@ -35,141 +57,545 @@ class EnvelopeRecipientInfo(TypedDict):
     note: Optional[str]
 
 
-def envelopes(recipients: List[EnvelopeRecipientInfo], our_lines, out_file):
-    """Generate envelopes with address block."""
-    pagesize = landscape(C3)
-    page_width, page_height = pagesize
+# Number of envelopes rendered by a single worker process.
+ENVELOPES_CHUNK_SIZE = 250
 
-    ksicht_contact_paragraph_style = ParagraphStyle(
-        "Normal",
-        fontName="Helvetica",
-        fontSize=28,
-        leading=32,
-    )
-    note_paragraph_style = ParagraphStyle(
-        "Normal",
-        fontName="Helvetica",
-        alignment=reportlab.lib.enums.TA_RIGHT,
-        fontSize=28,
-        leading=32,
-    )
-    page_paragraph_style = ParagraphStyle(
-        "Normal",
-        fontName="Helvetica",
-        fontSize=38,
-        leading=56,
-        borderWidth=1,
-        borderRadius=8,
-        borderPadding=24,
-        borderColor="#000",
-    )
-    ksicht_contact_paragraph = Paragraph(
-        "<br />".join(our_lines), style=ksicht_contact_paragraph_style
-    )
-    ksicht_contact_height = ksicht_contact_paragraph.wrap(620, 1000)[1]
 
-    packet = io.BytesIO()
-    can = canvas.Canvas(packet, pagesize=pagesize)
+def envelopes(
+    recipients: List[EnvelopeRecipientInfo],
+    our_lines,
+    out_file,
+    workers: int = 1,
+    chunk_size: int = ENVELOPES_CHUNK_SIZE,
+):
+    """Generate envelopes with address block.
+
+    Large printouts are split into chunks of `chunk_size` envelopes, which are rendered
+    by up to `workers` processes in parallel and merged in the original order.
+    """
+    if workers <= 1 or len(recipients) <= chunk_size:
+        out_file.write(render_envelopes(recipients, our_lines))
+        return out_file
+
+    chunks = [
+        recipients[start : start + chunk_size]
+        for start in range(0, len(recipients), chunk_size)
+    ]
+
+    with ProcessPoolExecutor(max_workers=min(workers, len(chunks))) as executor:
+        parts = executor.map(render_envelopes, chunks, repeat(our_lines))
+        concatenate((io.BytesIO(part) for part in parts), out_file)
+
+    return out_file
+
+
+ENVELOPE_PAGESIZE = landscape(C3)
+
+SENDER_PARAGRAPH_STYLE = ParagraphStyle(
+    "Normal",
+    fontName=FONT_NAME,
+    fontSize=28,
+    leading=32,
+)
+NOTE_PARAGRAPH_STYLE = ParagraphStyle(
+    "Normal",
+    fontName=FONT_NAME,
+    alignment=reportlab.lib.enums.TA_RIGHT,
+    fontSize=28,
+    leading=32,
+)
+ADDRESS_PARAGRAPH_STYLE = ParagraphStyle(
+    "Normal",
+    fontName=FONT_NAME,
+    fontSize=38,
+    leading=56,
+    borderWidth=1,
+    borderRadius=8,
+    borderPadding=24,
+    borderColor="#000",
+)
+
+
+def plain_lines(lines: Sequence[str], style: ParagraphStyle, max_width: float):
+    """Prepare lines to be drawn as they are, without `Paragraph` markup and wrapping.
 
-    for recipient in recipients:
-        paragraph = Paragraph("<br />".join(recipient["lines"]), style=page_paragraph_style)
-        paragraph_width = paragraph.wrap(700, 1000)[0]
-        paragraph.drawOn(can, page_width - paragraph_width - 48, 270)
+    Whitespace is collapsed the same way `Paragraph` does it.
 
-        ksicht_contact_paragraph.drawOn(can, 24, page_height - 24 - ksicht_contact_height)
+    :return: Lines to draw or None if some line contains markup or is wider than `max_width`.
+    """
+    result = []
+
+    for line in lines:
+        if "<" in line or ">" in line or "&" in line:
+            return None
+
+        line = " ".join(line.split())
+
+        if stringWidth(line, style.fontName, style.fontSize) > max_width:
+            return None
+
+        result.append(line)
+
+    # Paragraph ignores trailing line breaks.
+    while result and not result[-1]:
+        result.pop()
+
+    return result
+
+
+def draw_lines(can, lines: Sequence[str], style: ParagraphStyle, x: float, y: float):
+    """Draw lines with their bottom at `x`, `y`, laid out as a left-aligned `Paragraph`."""
+    text = can.beginText(x, y + len(lines) * style.leading - style.fontSize)
+    text.setFont(style.fontName, style.fontSize, style.leading)
+
+    for line in lines:
+        text.textLine(line)
+
+    can.drawText(text)
+
+
+class EnvelopeTemplate:
+    """Draws envelope pages onto a canvas.
+
+    The sender block and address borders are drawn only once into form XObjects that
+    the pages refer to.
+    Address and note lines are drawn directly by the canvas, `Paragraph` is only used
+    for those that don't fit (and need wrapping) or contain markup.
+    """
+
+    SENDER_FORM_NAME = "sender"
+
+    ADDRESS_WIDTH = 700
+    NOTE_WIDTH = 300
+    SENDER_WIDTH = 620
+
+    def __init__(self, can, our_lines: Sequence[str]):
+        self.can = can
+        self.page_width, self.page_height = ENVELOPE_PAGESIZE
+        self.box_forms = set()
+
+        can.beginForm(self.SENDER_FORM_NAME)
+        self._draw_block(
+            our_lines,
+            SENDER_PARAGRAPH_STYLE,
+            self.SENDER_WIDTH,
+            left=24,
+            top=self.page_height - 24,
+        )
+        can.endForm()
+
+    def _draw_block(self, lines, style, max_width, left, top):
+        if (plain := plain_lines(lines, style, max_width)) is not None:
+            draw_lines(self.can, plain, style, left, top - len(plain) * style.leading)
+            return
+
+        paragraph = Paragraph("<br />".join(lines), style=style)
+        height = paragraph.wrap(max_width, 1000)[1]
+        paragraph.drawOn(self.can, left, top - height)
+
+    def draw_address(self, lines: Sequence[str]):
+        style = ADDRESS_PARAGRAPH_STYLE
+        left = self.page_width - self.ADDRESS_WIDTH - 48
+        bottom = 270
+
+        if (plain := plain_lines(lines, style, self.ADDRESS_WIDTH)) is None:
+            paragraph = Paragraph("<br />".join(lines), style=style)
+            paragraph.wrap(self.ADDRESS_WIDTH, 1000)
+            paragraph.drawOn(self.can, left, bottom)
+            return
+
+        # Border only depends on the number of lines, each one is drawn just once.
+        box_form_name = f"address_box_{len(plain)}"
+
+        if box_form_name not in self.box_forms:
+            padding = style.borderPadding
+            self.can.beginForm(box_form_name)
+            self.can.setStrokeColor(style.borderColor)
+            self.can.setLineWidth(style.borderWidth)
+            self.can.roundRect(
+                left - padding,
+                bottom - padding,
+                self.ADDRESS_WIDTH + 2 * padding,
+                len(plain) * style.leading + 2 * padding,
+                style.borderRadius,
+                stroke=1,
+                fill=0,
+            )
+            self.can.endForm()
+            self.box_forms.add(box_form_name)
+
+        self.can.doForm(box_form_name)
+        draw_lines(self.can, plain, style, left, bottom)
+
+    def draw_note(self, note: str):
+        style = NOTE_PARAGRAPH_STYLE
+        right = self.page_width - 24
+        top = self.page_height - 24
+
+        if (plain := plain_lines([note], style, self.NOTE_WIDTH)) is None:
+            paragraph = Paragraph(note, style=style)
+            note_width, note_height = paragraph.wrap(self.NOTE_WIDTH, 200)
+            paragraph.drawOn(self.can, right - note_width, top - note_height)
+            return
+
+        if plain:
+            self.can.setFont(style.fontName, style.fontSize, style.leading)
+            self.can.drawRightString(right, top - style.fontSize, plain[0])
+
+    def draw(self, recipient: EnvelopeRecipientInfo):
+        self.draw_address(recipient["lines"])
+        self.can.doForm(self.SENDER_FORM_NAME)
 
         if recipient["note"]:
-            note_paragraph = Paragraph(
-                recipient["note"],
-                style=note_paragraph_style,
+            self.draw_note(recipient["note"])
+
+        self.can.showPage()  # Close current page & start new one
+
+
+# Reportlab settings are global, renders in other threads must not see them changed.
+RL_CONFIG_LOCK = threading.Lock()
+
+
+@contextmanager
+def binary_streams():
+    """Let reportlab write streams as binary while rendering.
+
+    ASCII85 encoding makes them bigger and is slow to produce. Reportlab only has
+    a global setting for it, read as pages get closed and the document saved. The whole
+    render has to hold `RL_CONFIG_LOCK`.
+    """
+    with RL_CONFIG_LOCK:
+        use_a85 = reportlab.rl_config.useA85
+        reportlab.rl_config.useA85 = 0
+
+        try:
+            yield
+        finally:
+            reportlab.rl_config.useA85 = use_a85
+
+
+def render_envelopes(recipients: List[EnvelopeRecipientInfo], our_lines) -> bytes:
+    """Render envelopes into a new PDF document, see `envelopes`."""
+    register_fonts()
+    packet = io.BytesIO()
+
+    with binary_streams():
+        can = canvas.Canvas(packet, pagesize=ENVELOPE_PAGESIZE)
+        template = EnvelopeTemplate(can, our_lines)
+
+        for recipient in recipients:
+            template.draw(recipient)
+
+        can.save()
+
+    return packet.getvalue()
+
+
+class StreamingPdfWriter:
+    """PDF writer sending pages to the output file as soon as they are added.
+
+    Unlike `pdfrw.PdfWriter` it doesn't keep the added pages around, so memory use is
+    bounded by the largest input file, not by the size of the whole output. Objects
+    shared by pages (fonts, images) are written once per input file, see `next_input`.
+    """
+
+    # Page tree root and document catalog, written once all the pages are known.
+    PAGES_OBJNUM = 1
+    CATALOG_OBJNUM = 2
+
+    def __init__(self, out_file):
+        self.out_file = out_file
+        self.offset = 0
+        self.offsets = {}
+        self.page_objnums = []
+        self.next_objnum = self.CATALOG_OBJNUM + 1
+        self.objnums_by_id = {}
+        self.keep_alive = []
+        self.deferred = []
+        self._write("%PDF-1.3\n%\xe2\xe3\xcf\xd3\n")
+
+    def _write(self, data: str):
+        data = data.encode("latin-1")
+        self.out_file.write(data)
+        self.offset += len(data)
+
+    def _write_object(self, objnum: int, data: str):
+        self.offsets[objnum] = self.offset
+        self._write(f"{objnum} 0 obj\n{data}\nendobj\n")
+
+    def _reference(self, obj, objnum: Optional[int] = None):
+        """Get reference to indirect object, scheduling it to be written if seen first."""
+        known_objnum = self.objnums_by_id.get(id(obj))
+
+        if known_objnum is not None:
+            return f"{known_objnum} 0 R"
+
+        if objnum is None:
+            objnum = self.next_objnum
+            self.next_objnum += 1
+
+        self.objnums_by_id[id(obj)] = objnum
+        # Object ids are only unique among living objects.
+        self.keep_alive.append(obj)
+        self.deferred.append((objnum, obj))
+        return f"{objnum} 0 R"
+
+    def _format_value(self, obj):
+        if isinstance(obj, PdfDict):
+            indirect = obj.indirect or (obj.stream is not None)
+        else:
+            indirect = getattr(obj, "indirect", False)
+
+        if indirect or id(obj) in self.objnums_by_id:
+            return self._reference(obj)
+        return self._format(obj)
+
+    def _format(self, obj):
+        if isinstance(obj, PdfDict):
+            pairs = " ".join(
+                f"{getattr(key, 'encoded', None) or key} {self._format_value(value)}"
+                for key, value in obj.iteritems()
             )
-            note_width, note_height = note_paragraph.wrap(300, 200)
-            note_paragraph.drawOn(can, page_width - 24 - note_width, page_height - 24 - note_height)
+            result = f"<<{pairs}>>"
+            if obj.stream is not None:
+                result = f"{result}\nstream\n{obj.stream}\nendstream"
+            return result
+        if isinstance(obj, dict):
+            return self._format(PdfDict(obj))
+        if isinstance(obj, (list, tuple)):
+            return "[" + " ".join(self._format_value(x) for x in obj) + "]"
+        if hasattr(obj, "indirect"):
+            return str(getattr(obj, "encoded", None) or obj)
+        return pdfrw_user_fmt(obj)
+
+    def add_page(self, page):
+        """Write the page and every object it refers to."""
+        objnum = self.next_objnum
+        self.next_objnum += 1
+        self.page_objnums.append(objnum)
+
+        # Refer to our page tree instead of the one of the input file.
+        parent = page.Parent
+        while parent is not None:
+            self.objnums_by_id[id(parent)] = self.PAGES_OBJNUM
+            self.keep_alive.append(parent)
+            parent = parent.Parent
+
+        inheritable = page.inheritable
+        new_page = PdfDict(
+            page,
+            Resources=inheritable.Resources,
+            MediaBox=inheritable.MediaBox,
+            CropBox=inheritable.CropBox,
+            Rotate=inheritable.Rotate,
+        )
+        # Links within the document should point to the new page.
+        self.objnums_by_id[id(page)] = objnum
+        self.keep_alive.append(page)
+        self._reference(new_page, objnum)
+
+        while self.deferred:
+            deferred_objnum, obj = self.deferred.pop()
+            self._write_object(deferred_objnum, self._format(obj))
+
+    def add_pages(self, pages):
+        for page in pages:
+            self.add_page(page)
+
+    def next_input(self):
+        """Forget objects of the previous input file, so that they can be freed."""
+        self.objnums_by_id = {}
+        self.keep_alive = []
+
+    def close(self):
+        """Write page tree, catalog and cross-reference table."""
+        kids = " ".join(f"{objnum} 0 R" for objnum in self.page_objnums)
+        self._write_object(
+            self.PAGES_OBJNUM,
+            f"<</Count {len(self.page_objnums)} /Kids [{kids}] /Type /Pages>>",
+        )
+        self._write_object(
+            self.CATALOG_OBJNUM, f"<</Pages {self.PAGES_OBJNUM} 0 R /Type /Catalog>>"
+        )
+
+        xref_offset = self.offset
+        self._write(f"xref\n0 {self.next_objnum}\n0000000000 65535 f\r\n")
+
+        for objnum in range(1, self.next_objnum):
+            self._write(f"{self.offsets[objnum]:010d} 00000 n\r\n")
+
+        self._write(
+            f"trailer\n\n<</Root {self.CATALOG_OBJNUM} 0 R /Size {self.next_objnum}>>\n"
+            f"startxref\n{xref_offset}\n%%EOF\n"
+        )
+
+
+def read_pdf(in_file):
+    """Read PDF file using pdfrw.
+
+    Files pdfrw can't parse (e.g. having a damaged cross-reference table) are repaired
+    by pypdf first. `PdfReadError` is raised if the file can't be read at all.
+    """
+    try:
+        return PdfReader(in_file)
+    except PdfParseError:
+        if hasattr(in_file, "seek"):
+            in_file.seek(0)
 
-        can.showPage() # Close current page & start new one
+        repaired = io.BytesIO()
+        writer = PdfFileWriter(clone_from=PdfFileReader(in_file))
+        writer.write(repaired)
+        writer.close()
+        repaired.seek(0)
+        return PdfReader(repaired)
 
-    can.save()
-    packet.seek(0)
-    out_file.write(packet.read())
 
-    return out_file
+def open_pdf(in_file):
+    """Read PDF file using pdfrw, opening (and closing) storage files as needed."""
+    if isinstance(in_file, FieldFile):
+        with in_file.open("rb") as f:
+            return read_pdf(f)
+    return read_pdf(in_file)
 
 
 def concatenate(in_files, out_file, as_duplex=False):
-    """Merge all input PDF files into a single out file."""
-    writer = PdfWriter()
+    """Merge all input PDF files into a single out file.
+
+    Input files are opened one by one and written to the output right away, so only
+    a single input is held in memory at any time. With `as_duplex`, inputs having an odd
+    number of pages are followed by a blank page. Inputs are expected to be padded
+    already where possible (see `stamp_submission`), the page count is then only taken
+    from the page tree read for copying.
+    """
+    writer = StreamingPdfWriter(out_file)
 
     for f in in_files:
-        current_pdf = PdfReader(f)
+        current_pdf = open_pdf(f)
         num_pages = len(current_pdf.pages)
 
-        writer.addpages(current_pdf.pages)
+        writer.add_pages(current_pdf.pages)
 
         if as_duplex and (num_pages >= 1) and (num_pages % 2 == 1):
             # add blank A4 page
-            writer.addpage(get_blank_page())
+            writer.add_page(get_blank_page())
 
-    writer.write(out_file)
+        writer.next_input()
+
+    writer.close()
     return out_file
 
 
+@lru_cache(maxsize=None)
 def get_blank_page():
-    if not Path(blank_pdf_filename := settings.BLANK_PDF_FILEPATH).exists():
-        writer = PdfFileWriter()
-        writer.add_blank_page(width=PaperSize.A4.width, height=PaperSize.A4.height)
-        with open(blank_pdf_filename, "wb") as fp:
-            writer.write(fp)
-            writer.close()
-    return PdfReader(blank_pdf_filename).pages[0]
+    """Blank A4 page, generated in memory once per process and shared by all exports."""
+    writer = PdfFileWriter()
+    writer.add_blank_page(width=PaperSize.A4.width, height=PaperSize.A4.height)
+    blank_pdf = io.BytesIO()
+    writer.write(blank_pdf)
+    writer.close()
+    blank_pdf.seek(0)
+    return PdfReader(blank_pdf).pages[0]
+
+
+def pages_with_memo(x: int, y: int, labels: Sequence[str]) -> List[PageObject]:
+    """Render every label on its own page.
+
+    All the pages come from a single canvas, so any number of labels costs just one
+    reportlab render and one parse.
+    """
+    register_fonts()
+    packet = io.BytesIO()
 
+    # Rendered with reportlab defaults, not the envelope settings.
+    with RL_CONFIG_LOCK:
+        can = canvas.Canvas(packet, pagesize=A4)
 
-def delete_blank_file():
-    if Path(blank_pdf_filename := settings.BLANK_PDF_FILEPATH).exists():
-        os.remove(blank_pdf_filename)
+        for label in labels:
+            can.setFont(FONT_NAME, 24)
+            can.drawString(x, y, label)
+            can.showPage()
 
+        can.save()
 
-def page_with_memo(x: int, y: int, label: str):
-    packet = io.BytesIO()
-    can = canvas.Canvas(packet, pagesize=A4)
-    can.setFont("Helvetica", 24)
-    can.drawString(x, y, label)
-    can.save()
     packet.seek(0)
-    return PdfFileReader(packet).pages[0]
+    return list(PdfFileReader(packet).pages)
+
+
+def count_pages(in_file) -> Optional[int]:
+    """Get number of pages of the PDF file, `None` if it can't be read."""
+    try:
+        return len(PdfFileReader(in_file).pages)
+    except PdfReadError:
+        return None
+
+
+def page_with_memo(x: int, y: int, label: str):
+    return pages_with_memo(x, y, [label])[0]
+
+
+@lru_cache(maxsize=None)
+def get_broken_file_page():
+    return page_with_memo(10, 200, "!! Tento PDF soubor je poškozený !!")
+
 
+def stamp_submission(
+    in_file, memo_page: PageObject, out_normal, out_duplex
+) -> PreparedSubmission:
+    """Stamp every page of the submission with the memo page and write both export variants.
 
-def prepare_submission_for_export(in_file, label: str):
-    """Prepare submission for exporting later on."""
-    working_file = io.BytesIO()
+    The file is parsed and every page stamped only once, both variants are written from
+    the same pages. The duplex variant only gets an extra blank page when needed.
+    """
     out_pdf = PdfFileWriter()
+    is_valid = True
 
     # Make sure the PDF file is valid. If it isn't render a PDF with error message contained.
     try:
-        in_pdf = PdfFileReader(in_file)
-        out_pdf.append_pages_from_reader(in_pdf)
+        out_pdf.append_pages_from_reader(PdfFileReader(in_file))
     except PdfReadError:  # noqa: F821
-        out_pdf.add_page(page_with_memo(10, 200, "!! Tento PDF soubor je poškozený !!"))
+        is_valid = False
+        out_pdf = PdfFileWriter()
+        out_pdf.add_page(get_broken_file_page())
 
-    out_pdf.write(working_file)
-    working_file.seek(0)
-
-    # Write person label
-    in_pdf = PdfFileReader(working_file)
-    out_pdf = PdfFileWriter()
-    memo_page = page_with_memo(10, 10, label)
-
-    for pagenum, _ in enumerate(in_pdf.pages):
+    for page in out_pdf.pages:
         # add the "watermark" (which is the new pdf) on the existing page
-        page = in_pdf.pages[pagenum]
         page.merge_page(memo_page)
-        out_pdf.add_page(page)
 
-    out_normal = deepcopy(out_pdf)
-    out_duplex = out_pdf
+    out_pdf.write(out_normal)
 
     # Ensure number of pages is even. Useful for duplex printing.
-    num_pages = len(in_pdf.pages)
+    num_pages = len(out_pdf.pages)
     if (num_pages % 2 == 1) and num_pages > 1:
-        out_duplex.add_blank_page(width=PaperSize.A4.width, height=PaperSize.A4.height)
+        out_pdf.add_blank_page(width=PaperSize.A4.width, height=PaperSize.A4.height)
+
+    out_pdf.write(out_duplex)
+    out_pdf.close()
+
+    return PreparedSubmission(page_count=num_pages, is_valid=is_valid)
+
+
+def prepare_submission_for_export(
+    in_file, label: str, out_normal, out_duplex
+) -> PreparedSubmission:
+    """Prepare submission for exporting later on, see `stamp_submission`."""
+    return stamp_submission(
+        in_file, page_with_memo(10, 10, label), out_normal, out_duplex
+    )
+
+
+def prepare_submissions_for_export(
+    submissions: Iterable[Tuple[object, str, object, object]]
+) -> List[PreparedSubmission]:
+    """Prepare many submissions at once, see `prepare_submission_for_export`.
+
+    :param submissions: Tuples of input file, label, normal and duplex output file.
+    """
+    submissions = list(submissions)
+    memo_pages = pages_with_memo(10, 10, [label for _, label, _, _ in submissions])
 
-    return out_normal, out_duplex
+    return [
+        stamp_submission(in_file, memo_page, out_normal, out_duplex)
+        for (in_file, _, out_normal, out_duplex), memo_page in zip(
+            submissions, memo_pages
+        )
+    ]
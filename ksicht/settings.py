@@ -11,6 +11,8 @@ https://docs.djangoproject.com/en/2.2/ref/settings/
 """
 
 import os
+import tempfile
+from urllib.parse import urlsplit
 
 from django.contrib.messages import constants as messages
 import dsnparse
@@ -93,6 +95,7 @@ MIDDLEWARE = [
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "ksicht.core.middleware.ParticipationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
     "django.contrib.flatpages.middleware.FlatpageFallbackMiddleware",
@@ -150,10 +153,35 @@ DATABASES = {
 }
 
 # Caching
+# Cache is shared by all the worker processes, pick the backend by `CACHE_DSN`:
+#   file:///var/cache/ksicht - directory on the local machine (default)
+#   db://ksicht_cache - database table, create it with `manage.py createcachetable`
+#   redis://localhost:6379/0 - Redis server
+#   memcached://localhost:11211 - memcached servers separated by comma, needs pymemcache
+#   locmem:// - private cache of every single process, for development only
+CACHE_DSN = os.environ.get(
+    "CACHE_DSN", "file://" + os.path.join(tempfile.gettempdir(), "ksicht_cache")
+)
+cache_dsn = urlsplit(CACHE_DSN)
+cache_backends = {
+    "file": ("django.core.cache.backends.filebased.FileBasedCache", cache_dsn.path),
+    "db": ("django.core.cache.backends.db.DatabaseCache", cache_dsn.netloc),
+    "redis": ("django.core.cache.backends.redis.RedisCache", CACHE_DSN),
+    "rediss": ("django.core.cache.backends.redis.RedisCache", CACHE_DSN),
+    "memcached": (
+        "django.core.cache.backends.memcached.PyMemcacheCache",
+        cache_dsn.netloc.split(","),
+    ),
+    "locmem": ("django.core.cache.backends.locmem.LocMemCache", cache_dsn.netloc),
+}
+
+if cache_dsn.scheme not in cache_backends:
+    raise RuntimeError(f"Unsupported CACHE_DSN scheme: {cache_dsn.scheme}")
+
 CACHES = {
     "default": {
-        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
-        "LOCATION": "default",
+        "BACKEND": cache_backends[cache_dsn.scheme][0],
+        "LOCATION": cache_backends[cache_dsn.scheme][1],
     }
 }
 
@@ -324,4 +352,6 @@ KSICHT_CONTACT_ADDRESS_LINES = [
     "128 43 Praha 2",
 ]
 
-BLANK_PDF_FILEPATH = os.path.join(MEDIA_ROOT, "blank_page.pdf")
+# Number of processes the job worker renders envelope printouts with. Envelopes
+# requested by the web process are always rendered serially.
+ENVELOPE_RENDER_WORKERS = int(os.environ.get("ENVELOPE_RENDER_WORKERS", 1))
@@ -0,0 +1,23 @@
+import time
+
+
+def timed(fn, *args, repeat=3, **kwargs):
+    """Run `fn` several times and return the best wall clock time in seconds."""
+    best = None
+
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(*args, **kwargs)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    return best
+
+
+def report(name, **measurements):
+    print(
+        f"\n{name}: "
+        + ", ".join(
+            f"{key}={value * 1000:.1f}ms" for key, value in measurements.items()
+        )
+    )
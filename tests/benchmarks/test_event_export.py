@@ -0,0 +1,47 @@
+from datetime import date
+
+import pytest
+
+from ksicht.core import models
+from . import report, timed
+
+
+pytestmark = [pytest.mark.benchmark, pytest.mark.django_db]
+
+
+def _build_event(signups_count, capacity):
+    event = models.Event.objects.create(
+        title="Letní soustředění",
+        start_date=date(2020, 7, 1),
+        end_date=date(2020, 7, 14),
+        capacity=capacity,
+    )
+    users = models.User.objects.bulk_create(
+        models.User(email=f"u{nr}@example.com") for nr in range(signups_count)
+    )
+    # Every other attendee has a participant profile.
+    models.Participant.objects.bulk_create(
+        models.Participant(user=u, city="Praha", school="--jiná--") for u in users[::2]
+    )
+    models.EventAttendee.objects.bulk_create(
+        models.EventAttendee(user=u, event=event) for u in users
+    )
+    return event
+
+
+@pytest.mark.parametrize("signups_count", (1_000, 5_000))
+def test_event_attendees_export(
+    admin_client, django_assert_max_num_queries, signups_count
+):
+    event = _build_event(signups_count, capacity=signups_count // 2)
+
+    def _export():
+        response = admin_client.get(event.get_export_url())
+        return b"".join(response.streaming_content)
+
+    # Export must not issue queries per attendee.
+    with django_assert_max_num_queries(10):
+        content = _export()
+
+    assert content.decode("utf8").count("Náhradník") == signups_count // 2
+    report(f"event_attendees_export[{signups_count}]", export=timed(_export))
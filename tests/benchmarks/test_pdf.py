@@ -0,0 +1,105 @@
+import io
+import os
+import tracemalloc
+
+import pytest
+
+from ksicht import pdf
+from ..test_pdf import make_pdf
+from . import report, timed
+
+
+pytestmark = [pytest.mark.benchmark]
+
+
+@pytest.mark.parametrize("num_pages", (1, 5, 40))
+def test_prepare_submission_for_export(num_pages):
+    scan = make_pdf(num_pages).getvalue()
+
+    def _prepare():
+        pdf.prepare_submission_for_export(
+            io.BytesIO(scan), "Řešitel".encode("utf8"), io.BytesIO(), io.BytesIO()
+        )
+
+    report(f"prepare_submission_for_export[{num_pages} pages]", time=timed(_prepare))
+
+
+def test_prepare_submissions_for_export():
+    scan = make_pdf(2).getvalue()
+    labels = [f"Řešitel {nr}" for nr in range(100)]
+
+    def _one_by_one():
+        for label in labels:
+            pdf.prepare_submission_for_export(
+                io.BytesIO(scan), label, io.BytesIO(), io.BytesIO()
+            )
+
+    def _batch():
+        pdf.prepare_submissions_for_export(
+            (io.BytesIO(scan), label, io.BytesIO(), io.BytesIO()) for label in labels
+        )
+
+    report(
+        "prepare_submissions_for_export[100 submissions]",
+        one_by_one=timed(_one_by_one),
+        batch=timed(_batch),
+    )
+
+
+def test_concatenate(tmp_path):
+    paths = []
+
+    for nr in range(200):
+        path = tmp_path / f"{nr}.pdf"
+        path.write_bytes(make_pdf(5).getvalue())
+        paths.append(path)
+
+    def _concatenate():
+        with open(tmp_path / "export.pdf", "wb") as out_file:
+            pdf.concatenate((str(p) for p in paths), out_file, True)
+
+    tracemalloc.start()
+    _concatenate()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    report("concatenate[200 files]", time=timed(_concatenate))
+    print(f"concatenate[200 files]: peak memory={peak / 1024 / 1024:.1f}MB")
+
+
+def test_envelopes():
+    recipients = [
+        {
+            "lines": (f"Řešitel {nr}", "Hlavova 2030", "128 43 Praha 2", "Česko"),
+            "note": "Brožura" if nr % 3 == 0 else None,
+        }
+        for nr in range(5000)
+    ]
+    workers = os.cpu_count() or 1
+
+    def _envelopes(**kwargs):
+        pdf.envelopes(recipients, ["KSICHT", "Hlavova 2030"], io.BytesIO(), **kwargs)
+
+    report(
+        f"envelopes[5000 recipients, {workers} CPUs]",
+        sequential=timed(_envelopes, repeat=1),
+        parallel=timed(_envelopes, workers=workers, repeat=1),
+    )
+
+
+def test_envelope_layout(monkeypatch):
+    recipients = [
+        {
+            "lines": (f"Řešitel {nr}", "Hlavova 2030", "128 43 Praha 2", "Česko"),
+            "note": "Brožura" if nr % 3 == 0 else None,
+        }
+        for nr in range(1000)
+    ]
+
+    def _render():
+        pdf.render_envelopes(recipients, ["KSICHT", "Hlavova 2030"])
+
+    fast = timed(_render)
+    # Force the Paragraph layout for every block.
+    monkeypatch.setattr(pdf, "plain_lines", lambda *args: None)
+    report("envelopes[1000 recipients]", fast=fast, paragraph=timed(_render))
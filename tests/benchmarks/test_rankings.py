@@ -0,0 +1,65 @@
+from decimal import Decimal
+import random
+
+import pydash as py_
+import pytest
+
+from ksicht.core import models
+from ksicht.core.rankings import rank_applications
+from . import report, timed
+
+
+pytestmark = [pytest.mark.benchmark]
+
+
+def _legacy_rank_applications(applications, tasks, submissions):
+    """Original implementation of `GradeSeries.get_rankings` scoring, kept for comparison."""
+    scoring_dict = {
+        a: {"by_tasks": {t: None for t in tasks}, "total": Decimal("0")}
+        for a in applications
+    }
+
+    for s in submissions:
+        a = py_.find(applications, lambda a: a.pk == s.application_id)
+        t = py_.find(tasks, lambda t: t.pk == s.task_id)
+
+        if t:
+            scoring_dict[a]["by_tasks"][t] = s.score
+
+        scoring_dict[a]["total"] += s.score or Decimal("0")
+
+    return sorted(scoring_dict.items(), key=lambda r: r[1]["total"], reverse=True)
+
+
+def _build_grade(applications_count):
+    rnd = random.Random(applications_count)
+    tasks = [models.Task(id=i, points=10) for i in range(1, 6)]
+    applications = [
+        models.GradeApplication(id=i, participant_id=i)
+        for i in range(1, applications_count + 1)
+    ]
+    submissions = [
+        models.TaskSolutionSubmission(
+            application_id=a.pk, task_id=t.pk, score=Decimal(rnd.randint(0, 10))
+        )
+        for a in applications
+        for t in tasks
+        if rnd.random() < 0.8
+    ]
+    return applications, tasks, submissions
+
+
+@pytest.mark.parametrize("applications_count", (100, 1_000, 10_000))
+def test_rank_applications(applications_count):
+    applications, tasks, submissions = _build_grade(applications_count)
+    measurements = {
+        "indexed": timed(rank_applications, applications, tasks, submissions)
+    }
+
+    # The legacy implementation is quadratic, 10 000 applications would take minutes.
+    if applications_count <= 1_000:
+        measurements["legacy"] = timed(
+            _legacy_rank_applications, applications, tasks, submissions, repeat=1
+        )
+
+    report(f"rank_applications[{applications_count}]", **measurements)
@@ -0,0 +1,97 @@
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+import random
+
+from django.core.cache import cache
+import pytest
+
+from ksicht.core import models
+from ksicht.core.stickers import engine, registry
+from . import report, timed
+
+
+pytestmark = [pytest.mark.benchmark, pytest.mark.django_db]
+
+
+def _build_grade(year, participants, rnd):
+    grade = models.Grade.objects.create(
+        school_year=str(year),
+        start_date=date(year, 8, 1),
+        end_date=date(year + 1, 7, 31),
+    )
+    applications = models.GradeApplication.objects.bulk_create(
+        models.GradeApplication(grade=grade, participant=p) for p in participants
+    )
+
+    for nr in range(1, 5):
+        series = models.GradeSeries.objects.create(
+            grade=grade,
+            series=str(nr),
+            submission_deadline=datetime(year, 9, 1, tzinfo=timezone.utc)
+            + timedelta(days=60 * nr),
+        )
+        tasks = models.Task.objects.bulk_create(
+            models.Task(series=series, nr=str(t), title=f"Úloha {t}", points=10)
+            for t in range(1, 6)
+        )
+        models.TaskSolutionSubmission.objects.bulk_create(
+            models.TaskSolutionSubmission(
+                application=a, task=t, score=Decimal(rnd.randint(0, 10))
+            )
+            for a in applications
+            for t in tasks
+            if rnd.random() < 0.6
+        )
+
+    return grade
+
+
+@pytest.fixture
+def grades():
+    rnd = random.Random(0)
+    users = models.User.objects.bulk_create(
+        models.User(email=f"u{nr}@example.com") for nr in range(2_000)
+    )
+    participants = models.Participant.objects.bulk_create(
+        models.Participant(user=u) for u in users
+    )
+    # The last grade is in progress.
+    today = date.today()
+    this_year = today.year if today.month >= 8 else today.year - 1
+
+    return [
+        _build_grade(year, participants, rnd)
+        for year in range(this_year - 3, this_year + 1)
+    ]
+
+
+def test_get_eligibility(grades):
+    cache.clear()
+    current_series = grades[-1].series.order_by("series").last()
+
+    cold = timed(engine.get_eligibility, current_series, repeat=1)
+    warm = timed(engine.get_eligibility, current_series)
+
+    report("get_eligibility[2000 participants, 4 grades]", cold=cold, warm=warm)
+
+
+def test_batch_resolvers(grades):
+    current_series = grades[-1].series.order_by("series").first()
+    batch = engine.get_batch(current_series)
+
+    def _per_context():
+        return [
+            registry.per_context(registry.get(nr))(batch)
+            for nr in registry.BATCH_STICKERS
+        ]
+
+    def _batch():
+        return [resolver(batch) for resolver in registry.BATCH_STICKERS.values()]
+
+    assert _per_context() == _batch()
+
+    report(
+        f"resolvers with batch alternative[{len(registry.BATCH_STICKERS)} stickers, 2000 participants]",
+        per_context=timed(_per_context),
+        batch=timed(_batch),
+    )
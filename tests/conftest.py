@@ -0,0 +1,10 @@
+from django.core.cache import cache
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    """Database is rolled back after every test, cached data must not outlive it."""
+    cache.clear()
+    yield
+    cache.clear()
@@ -0,0 +1,148 @@
+import os
+import subprocess
+import sys
+
+from django.contrib.auth.models import AnonymousUser, Group
+from django.contrib.flatpages.models import FlatPage
+from django.contrib.sites.models import Site
+from django.core.cache import cache
+import pytest
+
+from ksicht.core import caching, models
+from ksicht.core.templatetags.pages import pages_by_prefix
+
+
+pytestmark = [pytest.mark.django_db]
+
+
+CACHE_WORKER = """
+import django
+
+django.setup()
+
+from django.core.cache import cache
+from ksicht.core import caching
+
+action = "{action}"
+
+if action == "bump":
+    caching.bump(caching.FLATPAGE)
+
+key = caching.make_key("menu", caching.FLATPAGE)
+
+if action == "set":
+    cache.set(key, "{nr}")
+
+print(key, cache.get(key))
+"""
+
+
+def test_make_key(django_capture_on_commit_callbacks):
+    key = caching.make_key("test", caching.GRADE, caching.FLATPAGE)
+
+    assert key.startswith("test::grade.")
+    assert caching.make_key("test", caching.GRADE, caching.FLATPAGE) == key
+
+    # Versions get bumped only once the transaction commits.
+    with django_capture_on_commit_callbacks(execute=True):
+        caching.bump(caching.FLATPAGE)
+        assert caching.make_key("test", caching.GRADE, caching.FLATPAGE) == key
+
+    bumped = caching.make_key("test", caching.GRADE, caching.FLATPAGE)
+    assert bumped != key
+    assert bumped.split("::")[1] == key.split("::")[1]
+
+    # Evicted versions never fall back to any of the previous ones.
+    cache.clear()
+    assert caching.make_key("test", caching.GRADE, caching.FLATPAGE) not in (
+        key,
+        bumped,
+    )
+
+    with pytest.raises(ValueError):
+        caching.make_key("test", "unknown")
+
+
+def test_bump_on_change(django_capture_on_commit_callbacks):
+    page_key = caching.make_key("test", caching.FLATPAGE)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        page = FlatPage.objects.create(url="/info/a/", title="A")
+    assert caching.make_key("test", caching.FLATPAGE) != page_key
+
+    page_key = caching.make_key("test", caching.FLATPAGE)
+    grade_key = caching.make_key("test", caching.GRADE)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        page.sites.add(Site.objects.get_current())
+
+    assert caching.make_key("test", caching.FLATPAGE) != page_key
+    assert caching.make_key("test", caching.GRADE) == grade_key
+
+
+def test_pages_by_prefix(django_assert_num_queries, django_capture_on_commit_callbacks):
+    FlatPage.objects.create(url="/info/a/", title="A")
+    context = {"user": AnonymousUser()}
+
+    with django_assert_num_queries(1):
+        assert [p.url for p in pages_by_prefix(context, "/info/")] == ["/info/a/"]
+
+    with django_assert_num_queries(0):
+        assert [p.title for p in pages_by_prefix(context, "/info/")] == ["A"]
+
+    # Restricting access is picked up right after the commit.
+    with django_capture_on_commit_callbacks(execute=True):
+        group = Group.objects.create(name="Organizátoři")
+        meta = models.FlatPageMeta.objects.create(
+            flatpage=FlatPage.objects.create(url="/info/b/", title="B")
+        )
+        meta.allowed_groups.add(group, Group.objects.create(name="Jiní"))
+
+    assert [p.url for p in pages_by_prefix(context, "/info/")] == ["/info/a/"]
+
+    user = models.User.objects.create(email="u@example.com")
+    user.groups.add(group)
+    context = {"user": user}
+    pages_by_prefix(context, "/info/")
+
+    # Groups of the user get loaded just once.
+    with django_assert_num_queries(1):
+        assert [p.url for p in pages_by_prefix(context, "/info/")] == [
+            "/info/a/",
+            "/info/b/",
+        ]
+        assert pages_by_prefix(context, "/navody/") == []
+        assert pages_by_prefix(context, "/navody/") == []
+
+
+def test_shared_cache(tmp_path):
+    """Worker processes see each other's cached data and version bumps."""
+    env = {
+        **os.environ,
+        "DJANGO_SETTINGS_MODULE": "ksicht.settings",
+        "SECRET_KEY": "x",
+        "CACHE_DSN": f"file://{tmp_path}",
+    }
+
+    def run_workers(action, count=3):
+        workers = [
+            subprocess.Popen(
+                [sys.executable, "-c", CACHE_WORKER.format(action=action, nr=nr)],
+                env=env,
+                stdout=subprocess.PIPE,
+                text=True,
+            )
+            for nr in range(count)
+        ]
+        return [tuple(w.communicate()[0].split()) for w in workers]
+
+    [(key, _)] = run_workers("set", count=1)
+
+    assert run_workers("get") == [(key, "0")] * 3
+
+    # Every worker bumps on its own, nobody gets to see the data cached before.
+    assert all(k != key for k, _ in run_workers("bump"))
+
+    [(bumped, value)] = set(run_workers("get"))
+    assert bumped != key
+    assert value == "None"
@@ -0,0 +1,340 @@
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+import hashlib
+import io
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone as dj_timezone
+from pypdf import PdfReader
+import pytest
+
+from ksicht import pdf
+from ksicht.core import constants, envelopes, jobs, models
+from ..test_pdf import make_pdf
+
+
+pytestmark = [pytest.mark.django_db]
+
+
+@pytest.fixture
+def job_handlers():
+    calls = []
+
+    @jobs.handler("test_ok")
+    def _ok(**kwargs):
+        calls.append(kwargs)
+
+    @jobs.handler("test_fail")
+    def _fail(**kwargs):
+        raise ValueError("Broken")
+
+    yield calls
+
+    del jobs.HANDLERS["test_ok"]
+    del jobs.HANDLERS["test_fail"]
+
+
+def test_run_pending(job_handlers):
+    ok = models.Job.objects.enqueue("test_ok", value=1)
+    failing = models.Job.objects.enqueue("test_fail")
+
+    assert jobs.run_pending() == 2
+    assert jobs.run_pending() == 0
+    assert job_handlers == [{"value": 1}]
+
+    ok.refresh_from_db()
+    failing.refresh_from_db()
+
+    assert ok.status == models.Job.STATUS_DONE
+    assert ok.attempts == 1
+    assert failing.status == models.Job.STATUS_FAILED
+    assert "Broken" in failing.error
+
+
+def test_reclaim_stale(job_handlers, admin_client):
+    jobs_by_state = {}
+
+    for state, attempts in (("fresh", 1), ("stale", 1), ("broken", 3), ("done", 1)):
+        job = models.Job.objects.enqueue("test_ok", value=state)
+        models.Job.objects.claim_next()
+        models.Job.objects.filter(pk=job.pk).update(attempts=attempts)
+        jobs_by_state[state] = job
+
+    models.Job.objects.filter(pk=jobs_by_state["done"].pk).update(
+        status=models.Job.STATUS_DONE
+    )
+    models.Job.objects.exclude(pk=jobs_by_state["fresh"].pk).update(
+        started_at=dj_timezone.now() - models.JOB_RUNNING_TIMEOUT - timedelta(minutes=1)
+    )
+
+    assert models.Job.objects.reclaim_stale() == 1
+    assert jobs.run_pending() == 1
+    assert job_handlers == [{"value": "stale"}]
+
+    for job in jobs_by_state.values():
+        job.refresh_from_db()
+
+    assert jobs_by_state["fresh"].status == models.Job.STATUS_RUNNING
+    assert jobs_by_state["broken"].status == models.Job.STATUS_FAILED
+    assert jobs_by_state["done"].status == models.Job.STATUS_DONE
+
+    # Only failed (and stale) jobs can be retried from the administration.
+    admin_client.post(
+        reverse("admin:core_job_changelist"),
+        {
+            "action": "retry",
+            "_selected_action": [j.pk for j in jobs_by_state.values()],
+        },
+    )
+
+    assert dict(
+        models.Job.objects.filter(
+            pk__in=[j.pk for j in jobs_by_state.values()]
+        ).values_list("payload__value", "status")
+    ) == {
+        "fresh": models.Job.STATUS_RUNNING,
+        "stale": models.Job.STATUS_DONE,
+        "broken": models.Job.STATUS_PENDING,
+        "done": models.Job.STATUS_DONE,
+    }
+
+
+@pytest.fixture
+def task():
+    grade = models.Grade.objects.create(
+        school_year="2020", start_date=date(2020, 1, 1), end_date=date(2020, 12, 31)
+    )
+    series = models.GradeSeries.objects.create(
+        grade=grade,
+        series="1",
+        submission_deadline=datetime(2020, 3, 1, tzinfo=timezone.utc),
+    )
+    return models.Task.objects.create(series=series, nr="1", points=10)
+
+
+def _submission(task, **kwargs):
+    user = models.User.objects.create(email="u@example.com")
+    application = models.GradeApplication.objects.create(
+        participant=models.Participant.objects.create(user=user),
+        grade=task.series.grade,
+    )
+    return models.TaskSolutionSubmission.objects.create(
+        application=application, task=task, **kwargs
+    )
+
+
+def test_submission_export_preparation(task):
+    submission = _submission(task)
+
+    submission.schedule_export_preparation()
+
+    job = models.Job.objects.get(name=models.PREPARE_SUBMISSION_EXPORT_JOB)
+    assert submission.export_status == models.EXPORT_PENDING
+    assert job.payload == {"submission_id": submission.pk}
+
+    jobs.run_pending()
+
+    submission.refresh_from_db()
+    job.refresh_from_db()
+    assert submission.export_status == models.EXPORT_READY
+    assert job.status == models.Job.STATUS_DONE
+
+
+def test_export_preparation_keeps_other_fields(task, settings, tmp_path):
+    settings.MEDIA_ROOT = str(tmp_path)
+    submission = _submission(
+        task, file=SimpleUploadedFile("reseni.pdf", make_pdf(1).getvalue())
+    )
+    submission.schedule_export_preparation()
+
+    # Scored while the export job has the submission loaded already.
+    models.TaskSolutionSubmission.objects.filter(pk=submission.pk).update(
+        score=Decimal("7")
+    )
+    submission.ensure_export_ready()
+    submission.refresh_from_db()
+
+    assert submission.score == Decimal("7")
+    assert submission.is_export_ready()
+    assert submission.page_count == 1
+
+    # Prepared already, nothing gets written again.
+    name = submission.file_for_export_normal.name
+    models.TaskSolutionSubmission.objects.get(pk=submission.pk).ensure_export_ready()
+    submission.refresh_from_db()
+    assert submission.file_for_export_normal.name == name
+
+
+def test_submission_file_info(task, settings, tmp_path):
+    settings.MEDIA_ROOT = str(tmp_path)
+    content = make_pdf(3).getvalue()
+    submission = _submission(task, file=SimpleUploadedFile("reseni.pdf", content))
+
+    submission.schedule_export_preparation()
+    jobs.run_pending()
+    submission.refresh_from_db()
+
+    assert submission.page_count == 3
+    assert submission.file_size == len(content)
+    assert submission.file_hash == hashlib.sha256(content).hexdigest()
+    assert submission.is_valid_pdf is True
+
+    models.TaskSolutionSubmission.objects.update(
+        page_count=None, file_size=None, file_hash="", is_valid_pdf=None
+    )
+    call_command("backfill_submission_info")
+    submission.refresh_from_db()
+
+    assert submission.page_count == 3
+    assert submission.file_hash == hashlib.sha256(content).hexdigest()
+    assert submission.is_valid_pdf is True
+
+
+def test_backfill_submission_info_errors(task, settings, tmp_path, monkeypatch):
+    settings.MEDIA_ROOT = str(tmp_path)
+    invalid, broken, valid = [
+        models.TaskSolutionSubmission.objects.create(
+            application=models.GradeApplication.objects.create(
+                participant=models.Participant.objects.create(
+                    user=models.User.objects.create(email=f"u{nr}@example.com")
+                ),
+                grade=task.series.grade,
+            ),
+            task=task,
+            file=SimpleUploadedFile("reseni.pdf", content),
+        )
+        for nr, content in enumerate(
+            (b"not a pdf", b"%PDF-1.4 broken", make_pdf(2).getvalue())
+        )
+    ]
+    open_pdf = pdf.open_pdf
+
+    def _open_pdf(in_file):
+        if in_file.name == broken.file.name:
+            raise ValueError("Unexpected")
+        return open_pdf(in_file)
+
+    monkeypatch.setattr(pdf, "open_pdf", _open_pdf)
+    stderr = io.StringIO()
+    call_command("backfill_submission_info", stderr=stderr)
+
+    assert f"File of submission {broken.pk} can't be read" in stderr.getvalue()
+    assert dict(
+        models.TaskSolutionSubmission.objects.values_list("pk", "is_valid_pdf")
+    ) == {invalid.pk: False, broken.pk: None, valid.pk: True}
+
+
+def test_scheduled_jobs(task):
+    series = task.series
+    series.submission_deadline = datetime(2100, 1, 1, tzinfo=timezone.utc)
+    series.save()
+    series.schedule_export_bundles()
+
+    job = models.Job.objects.get(name=models.BUILD_EXPORT_BUNDLES_JOB)
+    assert job.run_after == series.submission_deadline
+    # Not due yet, the one for the original deadline got moved.
+    assert jobs.run_pending() == 0
+
+
+def test_export_bundles_scheduled_once(task, django_assert_num_queries):
+    series = task.series
+    series.schedule_export_bundles()
+
+    # Deadline has passed, downloads asking for the bundles don't touch the job again.
+    with django_assert_num_queries(1):
+        series.schedule_export_bundles()
+
+    job = models.Job.objects.get(name=models.BUILD_EXPORT_BUNDLES_JOB)
+    assert job.run_after == series.submission_deadline
+    assert jobs.run_pending() == 1
+
+
+def test_export_bundles_rescheduled_on_deadline_change(task, django_assert_num_queries):
+    series = models.GradeSeries.objects.get(pk=task.series.pk)
+    jobs.run_pending()
+
+    # Saving the series as it is (e.g. publishing results) leaves the bundles alone.
+    series.results_published = True
+    with django_assert_num_queries(1):
+        series.save()
+    assert not models.Job.objects.filter(
+        name=models.BUILD_EXPORT_BUNDLES_JOB, status=models.Job.STATUS_PENDING
+    ).exists()
+
+    series.submission_deadline = datetime(2100, 1, 1, tzinfo=timezone.utc)
+    series.save()
+    series.save()
+
+    job = models.Job.objects.get(
+        name=models.BUILD_EXPORT_BUNDLES_JOB, status=models.Job.STATUS_PENDING
+    )
+    assert job.run_after == series.submission_deadline
+
+
+def test_export_bundles(task, settings, tmp_path):
+    settings.MEDIA_ROOT = str(tmp_path)
+    _submission(task, file=SimpleUploadedFile("reseni.pdf", make_pdf(1).getvalue()))
+    jobs.run_pending()
+
+    submissions, _ = task.get_export_submissions()
+    fingerprint = task.get_export_fingerprint(submissions)
+
+    for as_duplex, num_pages in ((False, 1), (True, 2)):
+        bundle = models.ExportArtifact.objects.get_fresh(
+            task.get_export_bundle_key(as_duplex), fingerprint
+        )
+        with bundle.file.open("rb") as f:
+            assert len(PdfReader(f).pages) == num_pages
+
+    # Late submission makes the bundles stale until they are rebuilt.
+    late = models.TaskSolutionSubmission.objects.create(
+        application=models.GradeApplication.objects.create(
+            participant=models.Participant.objects.create(
+                user=models.User.objects.create(email="late@example.com")
+            ),
+            grade=task.series.grade,
+        ),
+        task=task,
+        file=SimpleUploadedFile("reseni.pdf", make_pdf(2).getvalue()),
+    )
+    submissions, _ = task.get_export_submissions()
+    fingerprint = task.get_export_fingerprint(submissions)
+    key = task.get_export_bundle_key()
+
+    assert late in submissions
+    assert models.ExportArtifact.objects.get_fresh(key, fingerprint) is None
+
+    task.series.schedule_export_bundles()
+    jobs.run_pending()
+
+    bundle = models.ExportArtifact.objects.get_fresh(key, fingerprint)
+    with bundle.file.open("rb") as f:
+        assert len(PdfReader(f).pages) == 3
+    assert models.ExportArtifact.objects.count() == 2
+
+
+def test_school_envelopes(settings, tmp_path):
+    settings.MEDIA_ROOT = str(tmp_path)
+
+    envelopes.schedule_school_envelopes()
+    envelopes.schedule_school_envelopes()
+    assert jobs.run_pending() == 1
+
+    artifact = models.ExportArtifact.objects.get(key=envelopes.SCHOOL_ENVELOPES_KEY)
+    with artifact.file.open("rb") as f:
+        assert len(PdfReader(f).pages) == len(constants.SCHOOLS)
+
+    # Up to date, nothing gets rebuilt.
+    assert envelopes.store_school_envelopes() == artifact
+    assert envelopes.store_school_envelopes().file.name == artifact.file.name
+
+    settings.KSICHT_CONTACT_ADDRESS_LINES = ["KSICHT", "Jinde 1"]
+    fingerprint = envelopes.school_envelopes_fingerprint()
+    assert fingerprint != artifact.fingerprint
+
+    envelopes.schedule_school_envelopes()
+    jobs.run_pending()
+    artifact.refresh_from_db()
+    assert artifact.fingerprint == fingerprint
@@ -1,8 +1,11 @@
-from datetime import date, timedelta
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
 
+from django.core.cache import cache
 import pytest
 
-from ksicht.core import models
+from ksicht.core import caching, jobs, models
+from ksicht.core.rankings import cumulative_max_scores
 
 
 pytestmark = [pytest.mark.django_db]
@@ -95,3 +98,166 @@ def test_active_in_series():
     active_in_series = models.Participant.objects.active_in_series(s3)
 
     assert sorted(list(active_in_series), key=lambda p: p.user_id) == [p1, p3]
+
+
+@pytest.fixture
+def scored_series():
+    grade = models.Grade.objects.create(
+        school_year="Current",
+        start_date=date(2020, 1, 1),
+        end_date=date(2020, 12, 31),
+    )
+    s1 = models.GradeSeries.objects.create(
+        grade=grade,
+        series="1",
+        submission_deadline=datetime(2020, 3, 1, tzinfo=timezone.utc),
+    )
+    s2 = models.GradeSeries.objects.create(
+        grade=grade,
+        series="2",
+        submission_deadline=datetime(2020, 6, 1, tzinfo=timezone.utc),
+    )
+    t1 = models.Task.objects.create(series=s1, nr="1", points=10)
+    t2 = models.Task.objects.create(series=s2, nr="1", points=5)
+    t3 = models.Task.objects.create(series=s2, nr="2", points=5)
+
+    applications = []
+
+    for nr in range(1, 5):
+        user = models.User.objects.create(email=f"u{nr}@example.com")
+        participant = models.Participant.objects.create(user=user)
+        applications.append(
+            models.GradeApplication.objects.create(participant=participant, grade=grade)
+        )
+
+    a1, a2, a3, a4 = applications
+
+    for application, task, score in (
+        (a1, t1, "3"),
+        (a1, t2, "5"),
+        (a2, t1, "10"),
+        (a2, t3, None),
+        (a3, t3, "1"),
+    ):
+        models.TaskSolutionSubmission.objects.create(
+            application=application,
+            task=task,
+            score=Decimal(score) if score else None,
+        )
+
+    return s1, s2, (a1, a2, a3, a4)
+
+
+def test_get_rankings(scored_series):
+    s1, s2, (a1, a2, a3, a4) = scored_series
+    rankings = s2.get_rankings()
+
+    assert rankings["max_score"] == 20
+    assert [
+        (application, rank, list(task_scores.values()), total)
+        for application, rank, task_scores, total in rankings["listing"]
+    ] == [
+        (a2, 1, [None, None], Decimal("10")),
+        (a1, 2, [Decimal("5"), None], Decimal("8")),
+        (a3, 3, [None, Decimal("1")], Decimal("1")),
+    ]
+    assert s1.get_rankings()["max_score"] == 10
+
+
+def test_cumulative_max_scores():
+    assert cumulative_max_scores([("1", 0), ("1", 0), ("2", 10)], "123") == {
+        "1": 0,
+        "2": 10,
+        "3": 10,
+    }
+    assert cumulative_max_scores([("2", 10)], "12") == {"1": None, "2": 10}
+
+
+def test_ranked_applications(scored_series):
+    s1, s2, (a1, a2, a3, a4) = scored_series
+    ranked = models.GradeApplication.objects.filter(grade=s1.grade).ranked(
+        list(s1.tasks.all()), up_to_series=s1.series, with_shared_ranks=True
+    )
+
+    assert [
+        (a.pk, a.task_score_0, a.total_score, a.rank, a.shared_rank, a.dense_rank)
+        for a in ranked
+    ] == [
+        (a2.pk, Decimal("10"), Decimal("10"), 1, 1, 1),
+        (a1.pk, Decimal("3"), Decimal("3"), 2, 2, 2),
+        (a3.pk, None, Decimal("0"), 3, 3, 3),
+        (a4.pk, None, Decimal("0"), 4, 3, 3),
+    ]
+
+    # Shared ranks are only computed on request.
+    annotations = models.GradeApplication.objects.ranked([]).query.annotations
+    assert "rank" in annotations
+    assert not {"shared_rank", "dense_rank"} & annotations.keys()
+
+
+def test_ranking_snapshot(scored_series):
+    s1, s2, (a1, a2, a3, a4) = scored_series
+
+    # Results are calculated on the fly until the snapshot gets built.
+    assert s2.get_ranking_snapshot() == s2.get_rankings()
+    assert not models.SeriesRanking.objects.exists()
+
+    jobs.run_pending()
+    s2.refresh_from_db()
+
+    assert s2.rankings_built_at is not None
+    assert s2.get_ranking_snapshot() == s2.get_rankings()
+
+    # Score edits get to the snapshot through a background job.
+    submission = models.TaskSolutionSubmission.objects.get(application=a3)
+    submission.score = Decimal("20")
+    submission.save()
+
+    assert s2.get_ranking_snapshot()["listing"][0][0] == a2
+
+    jobs.run_pending()
+
+    assert s2.get_ranking_snapshot() == s2.get_rankings()
+    assert s2.get_ranking_snapshot()["listing"][0][0] == a3
+
+
+def test_current_grade_cache(
+    django_assert_num_queries, django_capture_on_commit_callbacks
+):
+    now = datetime.now(timezone.utc)
+    grade = models.Grade.objects.create(
+        school_year="2020",
+        start_date=date.today() - timedelta(days=10),
+        end_date=date.today() + timedelta(days=100),
+    )
+    closed, current = [
+        models.GradeSeries.objects.create(
+            grade=grade, series=nr, submission_deadline=deadline
+        )
+        for nr, deadline in (
+            ("1", now - timedelta(days=1)),
+            ("2", now + timedelta(minutes=30)),
+        )
+    ]
+
+    assert models.Grade.objects.get_current_with_series() == (grade, current)
+
+    # Cached until the current series deadline passes.
+    with django_assert_num_queries(0):
+        assert models.Grade.objects.get_current_with_series() == (grade, current)
+
+    timeout = models.Grade.objects._seconds_to_next_change(grade)
+    assert 30 * 60 - 60 < timeout <= 30 * 60 + 1
+
+    # Edits are picked up right after the commit. Anything cached in the meantime
+    # (by concurrent requests still seeing the old data) gets stale by then.
+    with django_capture_on_commit_callbacks(execute=True):
+        current.submission_deadline = now - timedelta(hours=1)
+        current.save()
+        closed.delete()
+        cache.set(
+            caching.make_key(models.CURRENT_GRADE_CACHE_KEY, caching.GRADE),
+            (grade, current),
+        )
+
+    assert models.Grade.objects.get_current_with_series() == (grade, None)
@@ -1,11 +1,12 @@
-from datetime import datetime
+from datetime import date, datetime, timedelta, timezone
 from decimal import Decimal
+import random
 from uuid import uuid4
 
 import pytest
 
 from ksicht.core import models
-from ksicht.core.stickers import resolvers
+from ksicht.core.stickers import engine, registry, resolvers
 
 
 pytestmark = [pytest.mark.django_db]
@@ -826,6 +827,27 @@ def test_random_2_percent(context, result):
     assert resolvers.random_2_percent(context) is result
 
 
+def test_random_2_percent_draws_once_per_evaluation():
+    participants = {p: {} for p in (p1, p2, p3, p4, p5)}
+    shared = {}
+    state = random.getstate()
+
+    results = [
+        resolvers.random_2_percent(
+            {
+                "participant": p,
+                "current": {"series": s2, "grade": {"by_participant": participants}},
+                "shared": shared,
+            }
+        )
+        for p in participants
+    ]
+
+    assert results == [False, False, False, False, True]
+    assert len(shared) == 1
+    assert random.getstate() == state
+
+
 @pytest.mark.parametrize(
     "context, result",
     (
@@ -1333,3 +1355,74 @@ def test_submitted_solution_in_each_task_of_last_two_grades(context, result):
     assert (
         resolvers.submitted_solution_in_each_task_of_last_two_grades(context) is result
     )
+
+
+def test_batch_resolvers_match_per_context_resolvers():
+    rnd = random.Random(1)
+    prev_grade = models.Grade.objects.create(
+        school_year="2019", start_date=date(2019, 1, 1), end_date=date(2019, 12, 31)
+    )
+    prev_task = models.Task.objects.create(
+        series=models.GradeSeries.objects.create(
+            grade=prev_grade,
+            series="1",
+            submission_deadline=datetime(2019, 3, 1, tzinfo=timezone.utc),
+        ),
+        nr="1",
+        points=10,
+    )
+    grade = models.Grade.objects.create(
+        school_year="2020", start_date=date(2020, 1, 1), end_date=date(2020, 12, 31)
+    )
+    series = [
+        models.GradeSeries.objects.create(
+            grade=grade,
+            series=str(nr),
+            submission_deadline=datetime(2020, 3 * nr, 1, tzinfo=timezone.utc),
+        )
+        for nr in (1, 2)
+    ]
+    tasks = [
+        models.Task.objects.create(series=series[0], nr="1", points=10),
+        models.Task.objects.create(series=series[0], nr="2", points=10),
+        models.Task.objects.create(series=series[1], nr="1", points=200),
+    ]
+
+    for nr in range(50):
+        user = models.User.objects.create(email=f"u{nr}@example.com")
+        participant = models.Participant.objects.create(user=user)
+        application = models.GradeApplication.objects.create(
+            participant=participant, grade=grade
+        )
+
+        # Some participants took part in the previous grade too.
+        if nr % 3:
+            models.TaskSolutionSubmission.objects.create(
+                application=models.GradeApplication.objects.create(
+                    participant=participant, grade=prev_grade
+                ),
+                task=prev_task,
+            )
+
+        for task in tasks:
+            if rnd.random() < 0.3:
+                continue
+
+            submission = models.TaskSolutionSubmission.objects.create(
+                application=application,
+                task=task,
+                file=rnd.choice(("", "reseni.pdf")),
+                score=rnd.choice((None, 0, 5, 10, 200)),
+            )
+            # Spread submissions from weeks to minutes before the deadline.
+            models.TaskSolutionSubmission.objects.filter(pk=submission.pk).update(
+                submitted_at=task.series.submission_deadline
+                - timedelta(minutes=rnd.choice((30, 60 * 24, 60 * 24 * 20)))
+            )
+
+    for s in series:
+        batch = engine.get_batch(s)
+
+        for sticker_nr, batch_resolver in registry.BATCH_STICKERS.items():
+            expected = registry.per_context(registry.get(sticker_nr))(batch)
+            assert batch_resolver(batch) == expected, sticker_nr
@@ -0,0 +1,400 @@
+from datetime import date, datetime, timezone
+from decimal import Decimal
+import io
+
+from django.contrib.auth.models import Permission
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.urls import reverse
+from pypdf import PdfReader
+import pytest
+
+from ksicht import pdf
+from ksicht.core import jobs, models, stickers, views
+from ksicht.core.middleware import ParticipationMiddleware
+from ksicht.core.views.helpers import get_current_grade
+from ..test_pdf import make_pdf
+
+
+pytestmark = [pytest.mark.django_db]
+
+
+@pytest.fixture
+def staff_client(client):
+    user = models.User.objects.create(email="staff@example.com", is_staff=True)
+    user.user_permissions.add(
+        *Permission.objects.filter(
+            codename__in=("view_grade", "export_event_attendees")
+        )
+    )
+    client.force_login(user)
+    return client
+
+
+def _participant(nr, **kwargs):
+    user = models.User.objects.create(
+        email=f"u{nr}@example.com", first_name=f"Jméno{nr}", last_name=f"Příjmení{nr}"
+    )
+    return models.Participant.objects.create(
+        user=user,
+        school="--jiná--",
+        school_alt_name=f"Škola{nr}",
+        city="Praha",
+        **kwargs,
+    )
+
+
+def _csv_lines(response):
+    assert response.streaming
+    return b"".join(response.streaming_content).decode("utf8").splitlines()
+
+
+def test_grade_results_export(staff_client):
+    grade = models.Grade.objects.create(
+        school_year="2020", start_date=date(2020, 1, 1), end_date=date(2020, 12, 31)
+    )
+    series = models.GradeSeries.objects.create(
+        grade=grade,
+        series="1",
+        submission_deadline=datetime(2020, 3, 1, tzinfo=timezone.utc),
+    )
+    t1 = models.Task.objects.create(series=series, nr="1", title="Úloha", points=10)
+    a1 = models.GradeApplication.objects.create(
+        grade=grade, participant=_participant(1), participant_current_grade="3"
+    )
+    a2 = models.GradeApplication.objects.create(
+        grade=grade, participant=_participant(2), participant_current_grade="4"
+    )
+    models.TaskSolutionSubmission.objects.create(
+        application=a2, task=t1, score=Decimal("7.5")
+    )
+
+    response = staff_client.get(
+        reverse("core:grade_results_export", kwargs={"pk": grade.pk})
+    )
+
+    header, *rows = [line.split(",") for line in _csv_lines(response)]
+
+    assert header == [
+        "Pořadí",
+        "Jméno",
+        "Příjmení",
+        "Ročník",
+        "Škola",
+        "Body 1. série - Úloha",
+        "Body celkem",
+    ]
+    assert [row[:5] for row in rows] == [
+        ["1.", "Jméno2", "Příjmení2", "4.", "--jiná--"],
+        ["2.", "Jméno1", "Příjmení1", "3.", "--jiná--"],
+    ]
+    # (task score, total score)
+    assert [
+        (Decimal(row[5]) if row[5] != "-" else None, Decimal(row[6])) for row in rows
+    ] == [(Decimal("7.5"), Decimal("7.5")), (None, Decimal("0"))]
+
+
+def test_event_attendees_export(staff_client):
+    event = models.Event.objects.create(
+        title="Soustředění",
+        start_date=date(2020, 7, 1),
+        end_date=date(2020, 7, 7),
+        capacity=1,
+    )
+
+    for nr in (1, 2):
+        participant = _participant(nr, phone=f"60000000{nr}")
+        models.EventAttendee.objects.create(user=participant.user, event=event)
+
+    response = staff_client.get(event.get_export_url())
+    lines = _csv_lines(response)
+
+    assert len(lines) == 4
+    assert lines[1].startswith("1.,")
+    assert lines[1].endswith(
+        "u1@example.com,Jméno1,Příjmení1,Účastník,600000001,,Škola1,Praha"
+    )
+    assert lines[2] == ""
+    assert lines[3].endswith(
+        "u2@example.com,Jméno2,Příjmení2,Náhradník,600000002,,Škola2,Praha"
+    )
+
+
+def test_event_attendees_export_without_capacity(staff_client):
+    event = models.Event.objects.create(
+        title="Exkurze", start_date=date(2020, 7, 1), end_date=date(2020, 7, 1)
+    )
+    models.EventAttendee.objects.create(
+        user=models.User.objects.create(email="guest@example.com"), event=event
+    )
+
+    lines = _csv_lines(staff_client.get(event.get_export_url()))
+
+    assert len(lines) == 2
+    assert ",guest@example.com,,,Účastník," in lines[1]
+
+
+def _sticker_overview_results(rf, series):
+    view = views.StickerAssignmentOverview()
+    view.setup(rf.get("/"), pk=series.pk)
+    view.object = series
+    return view.get_context_data()["results"]
+
+
+def test_sticker_assignment_evaluation(client, rf):
+    user = models.User.objects.create(email="scoring@example.com", is_staff=True)
+    user.user_permissions.add(
+        *Permission.objects.filter(codename__in=("view_gradeseries", "scoring"))
+    )
+    client.force_login(user)
+
+    grade = models.Grade.objects.create(
+        school_year="2020", start_date=date(2020, 1, 1), end_date=date(2020, 12, 31)
+    )
+    series = models.GradeSeries.objects.create(
+        grade=grade,
+        series="1",
+        submission_deadline=datetime(2020, 3, 1, tzinfo=timezone.utc),
+    )
+    task = models.Task.objects.create(series=series, nr="1", title="Úloha", points=10)
+    a1, a2 = [
+        models.GradeApplication.objects.create(
+            grade=grade, participant=_participant(nr), participant_current_grade="3"
+        )
+        for nr in (1, 2)
+    ]
+    solver = models.Sticker.objects.create(nr=1, title="Řešitel", handpicked=False)
+    all_tasks = models.Sticker.objects.create(nr=2, title="Vše", handpicked=False)
+    handpicked = models.Sticker.objects.create(nr=50, title="Ručně")
+    from_event = models.Sticker.objects.create(nr=51, title="Akce")
+
+    submission = models.TaskSolutionSubmission.objects.create(
+        application=a1, task=task, score=Decimal("5")
+    )
+    submission.stickers.add(handpicked)
+    event = models.Event.objects.create(
+        title="Exkurze",
+        start_date=date(2020, 2, 1),
+        end_date=date(2020, 2, 1),
+        capacity=1,
+    )
+    event.reward_stickers.add(from_event)
+    # a1 signs up second and thus is only a substitute
+    models.EventAttendee.objects.create(user=a2.participant.user, event=event)
+    models.EventAttendee.objects.create(user=a1.participant.user, event=event)
+
+    url = reverse(
+        "core:series_sticker_assignment_overview",
+        kwargs={"grade_id": grade.pk, "pk": series.pk},
+    )
+
+    assert _sticker_overview_results(rf, series) == {a1: [], a2: []}
+    assert client.post(url).status_code == 302
+
+    series.refresh_from_db()
+    assert series.stickers_evaluated_at is not None
+    assert _sticker_overview_results(rf, series) == {
+        a1: [solver, all_tasks, handpicked],
+        a2: [solver, from_event],
+    }
+    assert (
+        models.StickerAward.objects.get(application=a1, sticker=solver).resolver
+        == "solver"
+    )
+
+    # Nothing has changed, re-evaluation keeps the ledger as is.
+    awards = set(models.StickerAward.objects.values_list("pk", "created_at"))
+    assert stickers.engine.evaluate_series(series) == set()
+    assert set(models.StickerAward.objects.values_list("pk", "created_at")) == awards
+
+    # Changes made anywhere (e.g. admin) mark the ledger as outdated.
+    submission.delete()
+    series.refresh_from_db()
+    assert series.stickers_evaluated_at is None
+
+    assert stickers.engine.evaluate_series(series) == {a1.pk}
+    assert _sticker_overview_results(rf, series) == {
+        a1: [solver],
+        a2: [solver, from_event],
+    }
+
+    event.attendees.remove(a2.participant.user)
+    series.refresh_from_db()
+    assert series.stickers_evaluated_at is None
+
+    assert stickers.engine.evaluate_series(series) == {a1.pk, a2.pk}
+    assert _sticker_overview_results(rf, series) == {
+        a1: [solver, from_event],
+        a2: [solver],
+    }
+
+    event.reward_stickers.clear()
+    series.refresh_from_db()
+    assert series.stickers_evaluated_at is None
+
+    # New applicants get their stickers (and results) too.
+    stickers.engine.evaluate_series(series)
+    models.Job.objects.all().delete()
+    participant = _participant(3)
+    grade.participants.add(
+        participant, through_defaults={"participant_current_grade": "3"}
+    )
+    series.refresh_from_db()
+    assert series.stickers_evaluated_at is None
+    assert models.Job.objects.filter(name=models.REBUILD_SERIES_RANKINGS_JOB).exists()
+
+    a3 = models.GradeApplication.objects.get(participant=participant)
+    assert stickers.engine.evaluate_series(series) == {a3.pk}
+
+    participant.applications.clear()
+    series.refresh_from_db()
+    assert series.stickers_evaluated_at is None
+
+
+@pytest.mark.parametrize("duplex, num_pages", (("", 6), ("1", 8)))
+def test_solution_export(client, settings, tmp_path, monkeypatch, duplex, num_pages):
+    settings.MEDIA_ROOT = str(tmp_path)
+    user = models.User.objects.create(email="scoring@example.com", is_staff=True)
+    user.user_permissions.add(Permission.objects.get(codename="scoring"))
+    client.force_login(user)
+
+    grade = models.Grade.objects.create(
+        school_year="2020", start_date=date(2020, 1, 1), end_date=date(2020, 12, 31)
+    )
+    series = models.GradeSeries.objects.create(
+        grade=grade,
+        series="1",
+        submission_deadline=datetime(2020, 3, 1, tzinfo=timezone.utc),
+    )
+    task = models.Task.objects.create(series=series, nr="1", title="Úloha", points=10)
+    submissions = [
+        models.TaskSolutionSubmission.objects.create(
+            application=models.GradeApplication.objects.create(
+                grade=grade, participant=_participant(nr)
+            ),
+            task=task,
+            file=SimpleUploadedFile("reseni.pdf", make_pdf(nr).getvalue()),
+        )
+        for nr in (1, 2, 3)
+    ]
+    models.TaskSolutionSubmission.prepare_all_for_export(submissions)
+
+    # Prepared variants are only copied, there's no other parsing nor page counting.
+    opened = []
+    open_pdf = pdf.open_pdf
+    monkeypatch.setattr(pdf, "open_pdf", lambda f: opened.append(f) or open_pdf(f))
+    monkeypatch.setattr(pdf, "PdfFileReader", None)
+    monkeypatch.setattr(pdf, "count_pages", None)
+
+    url = reverse(
+        "core:task_solution_export",
+        kwargs={"grade_id": grade.pk, "task_id": task.pk},
+    )
+    response = client.get(url, {"duplex": duplex})
+
+    assert response.status_code == 200
+    assert len(opened) == 3
+    assert len(PdfReader(io.BytesIO(b"".join(response.streaming_content))).pages) == (
+        num_pages
+    )
+
+    # Once built, the bundle is served as is.
+    jobs.run_pending()
+    opened.clear()
+    response = client.get(url, {"duplex": duplex})
+
+    assert opened == []
+    assert len(PdfReader(io.BytesIO(b"".join(response.streaming_content))).pages) == (
+        num_pages
+    )
+
+
+def test_participation(rf, django_assert_num_queries):
+    grade = models.Grade.objects.create(
+        school_year="2100", start_date=date(2000, 1, 1), end_date=date(2100, 12, 31)
+    )
+    series = models.GradeSeries.objects.create(
+        grade=grade,
+        series="1",
+        submission_deadline=datetime(2100, 3, 1, tzinfo=timezone.utc),
+    )
+    task = models.Task.objects.create(series=series, nr="1", points=10)
+    participant = _participant(1)
+    application = models.GradeApplication.objects.create(
+        grade=grade, participant=participant
+    )
+    models.TaskSolutionSubmission.objects.create(application=application, task=task)
+
+    request = rf.get("/")
+    request.user = models.User.objects.get(pk=participant.user_id)
+    ParticipationMiddleware(lambda r: r)(request)
+    get_current_grade(request)
+
+    with django_assert_num_queries(1):
+        assert request.participation.is_participant
+        assert request.participation.is_grade_participant
+        assert request.participation.application_id == application.pk
+        assert request.user.is_participant()
+        assert request.user.participant_profile.user == request.user
+
+    request = rf.get("/")
+    request.user = models.User.objects.create(email="nobody@example.com")
+    ParticipationMiddleware(lambda r: r)(request)
+    get_current_grade(request)
+
+    with django_assert_num_queries(1):
+        assert not request.participation.is_participant
+        assert not request.participation.is_grade_participant
+        assert not request.user.is_participant()
+
+
+def test_solution_submit(client, settings, tmp_path):
+    settings.MEDIA_ROOT = str(tmp_path)
+    grade = models.Grade.objects.create(
+        school_year="2100", start_date=date(2000, 1, 1), end_date=date(2100, 12, 31)
+    )
+    series = models.GradeSeries.objects.create(
+        grade=grade,
+        series="1",
+        submission_deadline=datetime(2100, 3, 1, tzinfo=timezone.utc),
+    )
+    task = models.Task.objects.create(series=series, nr="1", points=10)
+    participant = _participant(1)
+    application = models.GradeApplication.objects.create(
+        grade=grade, participant=participant
+    )
+    client.force_login(participant.user)
+    url = reverse("core:solution_submit")
+    response = client.post(
+        f"{url}?task_id={task.pk}",
+        {
+            f"file_{task.pk}": SimpleUploadedFile(
+                "reseni.pdf", make_pdf(1).getvalue(), content_type="application/pdf"
+            )
+        },
+    )
+
+    assert response.status_code == 302
+    assert models.TaskSolutionSubmission.objects.get(task=task).application == (
+        application
+    )
+
+    # Participants not applied to the current grade can't submit anything.
+    application.delete()
+    assert client.get(url).status_code == 404
+
+
+def test_participant_required(client):
+    grade = models.Grade.objects.create(
+        school_year="2100", start_date=date(2000, 1, 1), end_date=date(2100, 12, 31)
+    )
+    models.GradeSeries.objects.create(
+        grade=grade,
+        series="1",
+        submission_deadline=datetime(2100, 3, 1, tzinfo=timezone.utc),
+    )
+    client.force_login(models.User.objects.create(email="nobody@example.com"))
+
+    response = client.get(reverse("core:solution_submit"))
+
+    assert response.status_code == 302
+    assert response.url.startswith(reverse("core:current_grade"))
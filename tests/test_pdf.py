@@ -0,0 +1,204 @@
+from concurrent.futures import ThreadPoolExecutor
+import io
+import re
+
+from pypdf import PaperSize, PdfReader
+import pytest
+import reportlab
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfgen import canvas
+
+from ksicht import pdf
+
+
+def make_pdf(num_pages):
+    packet = io.BytesIO()
+    can = canvas.Canvas(packet, pagesize=A4)
+
+    for nr in range(num_pages):
+        can.drawString(100, 100, f"Strana {nr + 1}")
+        can.showPage()
+
+    can.save()
+    packet.seek(0)
+    return packet
+
+
+@pytest.mark.parametrize("num_pages, duplex_pages", ((1, 1), (2, 2), (5, 6), (40, 40)))
+def test_prepare_submission_for_export(num_pages, duplex_pages):
+    out_normal, out_duplex = io.BytesIO(), io.BytesIO()
+
+    assert pdf.prepare_submission_for_export(
+        make_pdf(num_pages), "Řešitel".encode("utf8"), out_normal, out_duplex
+    ) == pdf.PreparedSubmission(page_count=num_pages, is_valid=True)
+
+    normal = PdfReader(out_normal)
+    duplex = PdfReader(out_duplex)
+
+    assert len(normal.pages) == num_pages
+    assert len(duplex.pages) == duplex_pages
+    assert "Řešitel" in normal.pages[-1].extract_text()
+    assert [p.extract_text() for p in duplex.pages[:num_pages]] == [
+        p.extract_text() for p in normal.pages
+    ]
+
+
+def test_prepare_submission_for_export_invalid_file():
+    out_normal, out_duplex = io.BytesIO(), io.BytesIO()
+
+    assert pdf.prepare_submission_for_export(
+        io.BytesIO(b"not a pdf"), b"label", out_normal, out_duplex
+    ) == pdf.PreparedSubmission(page_count=1, is_valid=False)
+    assert "poškozený" in PdfReader(out_normal).pages[0].extract_text()
+
+
+def test_prepare_submissions_for_export():
+    outputs = [(io.BytesIO(), io.BytesIO()) for _ in range(3)]
+
+    assert pdf.prepare_submissions_for_export(
+        (make_pdf(num_pages), f"Řešitel {num_pages}", out_normal, out_duplex)
+        for num_pages, (out_normal, out_duplex) in zip((1, 2, 3), outputs)
+    ) == [pdf.PreparedSubmission(page_count=n, is_valid=True) for n in (1, 2, 3)]
+
+    for num_pages, (out_normal, out_duplex) in zip((1, 2, 3), outputs):
+        normal = PdfReader(out_normal)
+        assert len(normal.pages) == num_pages
+        assert f"Řešitel {num_pages}" in normal.pages[0].extract_text()
+
+
+def test_count_pages():
+    assert pdf.count_pages(make_pdf(3)) == 3
+    assert pdf.count_pages(io.BytesIO(b"not a pdf")) is None
+
+
+@pytest.mark.parametrize("as_duplex, num_pages", ((False, 6), (True, 8)))
+def test_concatenate(as_duplex, num_pages):
+    in_files = []
+
+    for nr in (1, 2, 3):
+        out_normal = io.BytesIO()
+        pdf.prepare_submission_for_export(
+            make_pdf(nr), f"Řešitel {nr}", out_normal, io.BytesIO()
+        )
+        out_normal.seek(0)
+        in_files.append(out_normal)
+
+    out_file = pdf.concatenate(in_files, io.BytesIO(), as_duplex)
+    out_file.seek(0)
+    merged = PdfReader(out_file, strict=True)
+
+    assert len(merged.pages) == num_pages
+    assert "Řešitel 1" in merged.pages[0].extract_text()
+    assert "Řešitel 3" in merged.pages[-1 if not as_duplex else -2].extract_text()
+
+
+@pytest.mark.parametrize(
+    "damage",
+    (
+        lambda data: re.sub(rb"startxref\n\d+", b"startxref\n123", data),
+        # Offsets of all the objects are off.
+        lambda data: data.replace(b"\n", b"\n% padding\n", 1),
+    ),
+    ids=("wrong_xref_offset", "shifted_objects"),
+)
+def test_concatenate_damaged_file(damage):
+    damaged = io.BytesIO(damage(make_pdf(2).getvalue()))
+    out_file = pdf.concatenate([make_pdf(1), damaged], io.BytesIO())
+    out_file.seek(0)
+
+    # Cross-reference table of the damaged file gets reconstructed, pages are kept.
+    merged = PdfReader(out_file, strict=True)
+    assert len(merged.pages) == 3
+    assert "Strana 2" in merged.pages[-1].extract_text()
+
+
+@pytest.mark.parametrize(
+    "data",
+    (b"not a pdf", b"", make_pdf(2).getvalue()[:-200]),
+    ids=("garbage", "empty", "truncated"),
+)
+def test_concatenate_invalid_file(data):
+    with pytest.raises(pdf.PdfReadError):
+        pdf.concatenate([make_pdf(1), io.BytesIO(data)], io.BytesIO())
+
+
+def test_blank_page():
+    page = pdf.get_blank_page()
+
+    assert page is pdf.get_blank_page()
+    assert [float(x) for x in page.MediaBox] == [
+        0,
+        0,
+        PaperSize.A4.width,
+        PaperSize.A4.height,
+    ]
+
+
+def test_envelopes_in_parallel():
+    recipients = [
+        {"lines": (f"Řešitel {nr}", "Hlavova 2030", "128 43 Praha 2"), "note": None}
+        for nr in range(7)
+    ]
+    recipients[3]["note"] = "Brožura"
+
+    def _render(**kwargs):
+        out_file = pdf.envelopes(recipients, ["KSICHT"], io.BytesIO(), **kwargs)
+        out_file.seek(0)
+        return PdfReader(out_file).pages
+
+    sequential = _render()
+    parallel = _render(workers=2, chunk_size=3)
+
+    assert len(parallel) == len(sequential) == 7
+    assert [p.get_contents().get_data() for p in parallel] == [
+        p.get_contents().get_data() for p in sequential
+    ]
+    assert [p.extract_text() for p in parallel] == [
+        p.extract_text() for p in sequential
+    ]
+
+
+def test_envelopes_binary_streams():
+    use_a85 = reportlab.rl_config.useA85
+    recipients = [{"lines": ("Řešitel", "Hlavova 2030"), "note": None}]
+    rendered = pdf.render_envelopes(recipients, ["KSICHT"])
+
+    assert b"ASCII85Decode" not in rendered
+    # Other documents are rendered with reportlab defaults.
+    assert reportlab.rl_config.useA85 == use_a85
+
+    # Concurrent renders (e.g. in gunicorn threads) don't leave the setting changed.
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        renders = list(
+            executor.map(
+                lambda _: pdf.render_envelopes(recipients, ["KSICHT"]), range(8)
+            )
+        )
+
+    assert all(b"ASCII85Decode" not in r for r in renders)
+    assert reportlab.rl_config.useA85 == use_a85
+
+
+def test_envelopes_paragraph_fallback(monkeypatch):
+    paragraphs = []
+    paragraph_class = pdf.Paragraph
+    monkeypatch.setattr(
+        pdf,
+        "Paragraph",
+        lambda text, **kwargs: paragraphs.append(text)
+        or paragraph_class(text, **kwargs),
+    )
+    long_line = "Základní škola a mateřská škola s velmi dlouhým názvem"
+    recipients = [
+        {"lines": ("Řešitel", "Hlavova 2030", "128 43 Praha 2"), "note": "Brožura"},
+        {"lines": (long_line, "Hlavova 2030"), "note": None},
+    ]
+
+    out_file = pdf.envelopes(recipients, ["KSICHT"], io.BytesIO())
+    out_file.seek(0)
+    pages = PdfReader(out_file).pages
+
+    # Only the overflowing address gets wrapped by Paragraph.
+    assert paragraphs == [f"{long_line}<br />Hlavova 2030"]
+    assert "Brožura" in pages[0].extract_text()
+    assert "dlouhým" in pages[1].extract_text()